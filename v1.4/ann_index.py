@@ -0,0 +1,97 @@
+from imports import *
+from face_matcher import FaceMatcher, FaceMatch, pairwise_distances, squared_norms
+
+ASSIGN_CHUNK_SIZE = 8192
+TRAIN_POINTS_PER_LIST = 256
+
+def assign_to_centroids(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Номер ближайшего центроида для каждой строки (поблочно, чтобы не держать N x K в памяти)"""
+    centroids_sq_norms = squared_norms(centroids)
+    labels = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), ASSIGN_CHUNK_SIZE):
+        block = np.asarray(data[start:start + ASSIGN_CHUNK_SIZE], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmin(centroids_sq_norms[None, :] - 2.0 * (block @ centroids.T), axis=1)
+    return labels
+
+def kmeans(data: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """K-means (алгоритм Ллойда) на подвыборке данных"""
+    rng = np.random.default_rng(seed)
+    n_train = min(len(data), n_clusters * TRAIN_POINTS_PER_LIST)
+    sample = np.sort(rng.choice(len(data), n_train, replace=False))
+    train = np.asarray(data[sample], dtype=np.float32)
+    centroids = train[rng.choice(len(train), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign_to_centroids(train, centroids)
+        counts = np.bincount(labels, minlength=n_clusters)
+        order = np.argsort(labels, kind='stable')
+        non_empty = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[non_empty]
+        centroids[non_empty] = np.add.reduceat(train[order], starts, axis=0) / counts[non_empty, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = train[rng.choice(len(train), len(empty), replace=False)]
+    return centroids
+
+class IVFFaceMatcher(FaceMatcher):
+    index_type: str = 'ivf'
+
+    def __init__(self, encodings: Optional[np.ndarray] = None, names: Optional[Sequence[str]] = None, n_lists: Optional[int] = None,
+                 n_probe: int = 8, train_iterations: int = 10, seed: int = 0) -> None:
+        self.n_lists: Optional[int] = n_lists
+        self.n_probe: int = n_probe
+        self.train_iterations: int = train_iterations
+        self.seed: int = seed
+        self.centroids: np.ndarray = np.empty((0, 0), dtype=np.float32)
+        self.centroids_sq_norms: np.ndarray = np.empty(0, dtype=np.float32)
+        self.labels: np.ndarray = np.empty(0, dtype=np.int64)
+        self.list_rows: np.ndarray = np.empty(0, dtype=np.int64)
+        self.list_offsets: np.ndarray = np.zeros(1, dtype=np.int64)
+        super().__init__(encodings, names)
+
+    def set_database(self, encodings: np.ndarray, names: Sequence[str]) -> None:
+        """Замена базы с обучением центроидов и построением инвертированных списков"""
+        super().set_database(encodings, names)
+        count = len(self.names)
+        if count == 0:
+            self.centroids = np.empty((0, self.encodings.shape[1]), dtype=np.float32)
+        else:
+            n_lists = self.n_lists or int(round(m.sqrt(count)))
+            self.centroids = kmeans(self.encodings, max(1, min(n_lists, count)), self.train_iterations, self.seed)
+        self._build_lists()
+
+    def _build_lists(self) -> None:
+        """Раскладка записей базы по спискам ближайших центроидов"""
+        self.centroids_sq_norms = squared_norms(self.centroids)
+        labels = assign_to_centroids(self.encodings, self.centroids) if len(self.names) else np.empty(0, dtype=np.int64)
+        self.labels = labels
+        self.list_rows = np.argsort(labels, kind='stable')
+        self.list_offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=len(self.centroids))))).astype(np.int64)
+
+    def _on_rebased(self) -> None:
+        """Новая матрица раскладывается по уже обученным центроидам"""
+        if len(self.centroids) == 0:
+            self.set_database(self.encodings, list(self.names))
+            return
+        self._build_lists()
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Индексы записей из n_probe ближайших списков"""
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        centroid_distances = pairwise_distances(query[None, :], self.centroids, self.centroids_sq_norms)[0]
+        if n_probe < len(centroid_distances):
+            probe = np.argpartition(centroid_distances, n_probe - 1)[:n_probe]
+        else:
+            probe = np.arange(len(centroid_distances))
+        return np.concatenate([self.list_rows[self.list_offsets[idx]:self.list_offsets[idx + 1]] for idx in probe])
+
+    def match(self, face_encodings: Union[np.ndarray, Sequence[np.ndarray]], tolerance: float, top_k: int = 1, n_probe: Optional[int] = None) -> List[FaceMatch]:
+        """Приближенный поиск: точные расстояния только до записей из n_probe ближайших списков"""
+        queries = self._queries(face_encodings)
+        if len(self.names) == 0:
+            return [FaceMatch("Unknown", 1.0, []) for _ in range(len(queries))]
+        results: List[FaceMatch] = []
+        for query in queries:
+            rows = self.candidates(query, n_probe)
+            row = pairwise_distances(query[None, :], self.encodings[rows], self.sq_norms[rows])[0]
+            results.append(self._make_match(row, rows, tolerance, top_k))
+        return results
\ No newline at end of file
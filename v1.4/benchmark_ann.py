@@ -0,0 +1,86 @@
+from imports import *
+from config import DATABASE_PATH, ENCODING_CACHE_PATH
+from encoding_store import EncodingStore
+from face_matcher import FaceMatcher
+from ann_index import IVFFaceMatcher
+
+def synthetic_database(size: int, seed: int = 0) -> np.ndarray:
+    """Случайная база кодировок с масштабом, близким к кодировкам dlib"""
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.0, 0.1, (size, 128)).astype(np.float32)
+
+def make_queries(encodings: np.ndarray, count: int, noise: float, seed: int = 1) -> np.ndarray:
+    """Зашумленные копии случайных записей базы"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(encodings), min(count, len(encodings)), replace=False)
+    return (np.asarray(encodings[rows]) + rng.normal(0.0, noise, (len(rows), encodings.shape[1]))).astype(np.float32)
+
+def time_queries(matcher: FaceMatcher, queries: np.ndarray, tolerance: float, **kwargs: Any) -> Tuple[List[str], np.ndarray]:
+    """Имена top-1 и время поиска каждого запроса (мс)"""
+    names: List[str] = []
+    timings = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        result = matcher.match(query[None, :], tolerance, **kwargs)[0]
+        timings[i] = (time.perf_counter() - start) * 1000
+        names.append(result.top_k[0][0] if result.top_k else "Unknown")
+    return names, timings
+
+def run_benchmark(encodings: np.ndarray, queries: np.ndarray, n_lists: Optional[int], probes: List[int], tolerance: float) -> Dict[str, Any]:
+    """Сравнение IVF-индекса с полным перебором: recall@1 и задержка"""
+    names = [f"person_{i}" for i in range(len(encodings))]
+    brute = FaceMatcher(encodings, names)
+    brute_names, brute_timings = time_queries(brute, queries, tolerance)
+    start = time.perf_counter()
+    ivf = IVFFaceMatcher(encodings, names, n_lists=n_lists)
+    build_time = time.perf_counter() - start
+    report: Dict[str, Any] = {
+        'database_size': len(encodings),
+        'queries': len(queries),
+        'n_lists': len(ivf.centroids),
+        'build_time_s': build_time,
+        'brute_force': {'mean_ms': float(brute_timings.mean()), 'p95_ms': float(np.percentile(brute_timings, 95))},
+        'ivf': []
+    }
+    for n_probe in probes:
+        ivf_names, ivf_timings = time_queries(ivf, queries, tolerance, n_probe=n_probe)
+        recall = float(np.mean([a == b for a, b in zip(ivf_names, brute_names)]))
+        report['ivf'].append({
+            'n_probe': n_probe,
+            'recall_at_1': recall,
+            'mean_ms': float(ivf_timings.mean()),
+            'p95_ms': float(np.percentile(ivf_timings, 95)),
+            'speedup': float(brute_timings.mean() / ivf_timings.mean())
+        })
+    return report
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"База: {report['database_size']}, запросов: {report['queries']}, списков: {report['n_lists']}, построение: {report['build_time_s']:.2f} с")
+    print(f"Полный перебор: {report['brute_force']['mean_ms']:.3f} мс (p95 {report['brute_force']['p95_ms']:.3f} мс)")
+    print(f"{'n_probe':>8} {'recall@1':>9} {'mean, мс':>9} {'p95, мс':>9} {'ускорение':>10}")
+    for row in report['ivf']:
+        print(f"{row['n_probe']:>8} {row['recall_at_1']:>9.4f} {row['mean_ms']:>9.3f} {row['p95_ms']:>9.3f} {row['speedup']:>9.1f}x")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="IVF face index benchmark (recall@1 vs brute force)")
+    parser.add_argument('--size', type=int, default=100000, help="synthetic database size")
+    parser.add_argument('--cache', action='store_true', help="use encodings from the face database cache instead of synthetic data")
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--noise', type=float, default=0.02, help="per-dimension noise added to queries")
+    parser.add_argument('--lists', type=int, default=None, help="number of IVF lists (default: sqrt(N))")
+    parser.add_argument('--probes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--json', default=None, help="write the report to this JSON file")
+    args = parser.parse_args()
+    if args.cache:
+        encodings, _ = EncodingStore(DATABASE_PATH, ENCODING_CACHE_PATH).load()
+        if len(encodings) == 0:
+            raise SystemExit("Encoding cache is empty, run enrollment.py first.")
+    else:
+        encodings = synthetic_database(args.size)
+    report = run_benchmark(encodings, make_queries(encodings, args.queries, args.noise), args.lists, args.probes, args.tolerance)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
\ No newline at end of file
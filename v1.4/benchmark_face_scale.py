@@ -0,0 +1,125 @@
+from imports import *
+from config import FACE_RECOGNITION_CONFIG, DATABASE_PATH, ENCODING_CACHE_PATH
+from encoding_store import EncodingStore, IMAGE_EXTENSIONS
+from face_matcher import FaceMatcher
+from face_tracker import box_iou
+from face_recognizer import detect_face_locations
+
+def iter_frames(path: str, step: int = 1, limit: Optional[int] = None) -> Any:
+    """Кадры BGR из видеофайла или папки с изображениями"""
+    count = 0
+    if os.path.isdir(path):
+        filenames = sorted(filename for filename in os.listdir(path) if filename.lower().endswith(IMAGE_EXTENSIONS))
+        for filename in filenames[::step]:
+            frame = cv2.imread(os.path.join(path, filename))
+            if frame is None:
+                continue
+            yield frame
+            count += 1
+            if limit is not None and count >= limit:
+                return
+        return
+    capture = cv2.VideoCapture(path)
+    index = 0
+    try:
+        while True:
+            grabbed, frame = capture.read()
+            if not grabbed:
+                return
+            if index % step == 0:
+                yield frame
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+            index += 1
+    finally:
+        capture.release()
+
+def match_locations(reference: List[Tuple[int, int, int, int]], found: List[Tuple[int, int, int, int]], iou_threshold: float) -> List[Tuple[int, int]]:
+    """Жадное сопоставление рамок по IoU: пары (индекс эталона, индекс найденной)"""
+    pairs = []
+    used = set()
+    for i, ref_location in enumerate(reference):
+        best, best_iou = None, iou_threshold
+        for j, location in enumerate(found):
+            if j in used:
+                continue
+            iou = box_iou(ref_location, location)
+            if iou >= best_iou:
+                best, best_iou = j, iou
+        if best is not None:
+            used.add(best)
+            pairs.append((i, best))
+    return pairs
+
+def run_benchmark(frames: List[np.ndarray], scales: List[float], model: str, matcher: Optional[FaceMatcher], tolerance: float, iou_threshold: float) -> Dict[str, Any]:
+    """Задержка и полнота обнаружения лиц на разных масштабах относительно масштаба 1.0"""
+    rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+    results: Dict[float, List[Tuple[List[Tuple[int, int, int, int]], List[str]]]] = {}
+    report: Dict[str, Any] = {'frames': len(frames), 'model': model, 'scales': []}
+    for scale in [1.0] + [scale for scale in scales if scale != 1.0]:
+        detect_ms, encode_ms = [], []
+        per_frame = []
+        for rgb_frame in rgb_frames:
+            start = time.perf_counter()
+            locations = detect_face_locations(rgb_frame, model, scale=scale)
+            detected = time.perf_counter()
+            encodings = face_recognition.face_encodings(rgb_frame, locations)
+            encoded = time.perf_counter()
+            names = [result.name for result in matcher.match(encodings, tolerance)] if matcher is not None else []
+            detect_ms.append((detected - start) * 1000)
+            encode_ms.append((encoded - detected) * 1000)
+            per_frame.append((locations, names))
+        results[scale] = per_frame
+        reference_faces = matched_faces = same_identity = 0
+        for (ref_locations, ref_names), (locations, names) in zip(results[1.0], per_frame):
+            pairs = match_locations(ref_locations, locations, iou_threshold)
+            reference_faces += len(ref_locations)
+            matched_faces += len(pairs)
+            if matcher is not None:
+                same_identity += sum(1 for i, j in pairs if ref_names[i] == names[j])
+        detect_arr, encode_arr = np.array(detect_ms), np.array(encode_ms)
+        report['scales'].append({
+            'scale': scale,
+            'faces': sum(len(locations) for locations, _ in per_frame),
+            'recall_vs_full': matched_faces / reference_faces if reference_faces else None,
+            'identity_agreement': same_identity / matched_faces if matcher is not None and matched_faces else None,
+            'detect_mean_ms': float(detect_arr.mean()),
+            'detect_p95_ms': float(np.percentile(detect_arr, 95)),
+            'encode_mean_ms': float(encode_arr.mean()),
+            'total_mean_ms': float((detect_arr + encode_arr).mean())
+        })
+    return report
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Кадров: {report['frames']}, модель: {report['model']}")
+    print(f"{'scale':>6} {'лиц':>6} {'recall':>7} {'id':>6} {'детект, мс':>11} {'p95, мс':>8} {'кодир., мс':>11} {'всего, мс':>10}")
+    for row in report['scales']:
+        recall = f"{row['recall_vs_full']:.3f}" if row['recall_vs_full'] is not None else '-'
+        identity = f"{row['identity_agreement']:.3f}" if row['identity_agreement'] is not None else '-'
+        print(f"{row['scale']:>6} {row['faces']:>6} {recall:>7} {identity:>6} {row['detect_mean_ms']:>11.1f} {row['detect_p95_ms']:>8.1f} {row['encode_mean_ms']:>11.1f} {row['total_mean_ms']:>10.1f}")
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Face detection scale benchmark on recorded footage")
+    parser.add_argument('footage', help="video file or folder with JPEG/PNG frames")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.5, 0.25])
+    parser.add_argument('--model', default=FACE_RECOGNITION_CONFIG.get('model', 'hog'))
+    parser.add_argument('--step', type=int, default=5, help="use every N-th frame")
+    parser.add_argument('--limit', type=int, default=200, help="maximum number of frames")
+    parser.add_argument('--iou', type=float, default=0.5, help="IoU to count a face as found")
+    parser.add_argument('--no-identity', action='store_true', help="skip identity comparison with the encoding cache")
+    parser.add_argument('--json', default=None, help="write the report to this JSON file")
+    args = parser.parse_args()
+    frames = list(iter_frames(args.footage, args.step, args.limit))
+    if not frames:
+        raise SystemExit(f"No frames read from {args.footage}.")
+    matcher = None
+    if not args.no_identity:
+        encodings, names = EncodingStore(DATABASE_PATH, ENCODING_CACHE_PATH).load()
+        matcher = FaceMatcher(encodings, names) if names else None
+    report = run_benchmark(frames, args.scales, args.model, matcher, FACE_RECOGNITION_CONFIG['tolerance'], args.iou)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
\ No newline at end of file
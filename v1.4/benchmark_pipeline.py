@@ -0,0 +1,206 @@
+# Модули текущей версии (replay_source, stage_timer) импортируются только в __main__: при сравнении
+# версий дочерние процессы обработчиков заново импортируют этот файл уже с путями выбранной версии.
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from typing import Optional, Callable, Tuple, Any, List, Dict
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+OWN_DIR = os.path.dirname(os.path.abspath(__file__))
+SHARED_MODULES = ('replay_source', 'stage_timer')
+
+class MemorySampler:
+    def __init__(self, interval: float = 0.25) -> None:
+        self.interval: float = interval
+        self.samples: List[int] = []
+        self._stop: threading.Event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if psutil is None:
+            return
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+
+    def _sample(self) -> None:
+        process = psutil.Process()
+        while not self._stop.wait(self.interval):
+            try:
+                rss = process.memory_info().rss
+                for child in process.children(recursive=True):
+                    try:
+                        rss += child.memory_info().rss
+                    except psutil.Error:
+                        pass
+                self.samples.append(rss)
+            except psutil.Error:
+                continue
+
+    def stop(self) -> Dict[str, Any]:
+        """Память основного процесса и обработчиков (МБ)"""
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        if self.samples:
+            return {'source': 'psutil', 'peak_mb': max(self.samples) / 2**20, 'mean_mb': float(np.mean(self.samples)) / 2**20}
+        if resource is not None:
+            return {'source': 'ru_maxrss', 'peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'mean_mb': None}
+        return {'source': None, 'peak_mb': None, 'mean_mb': None}
+
+class ReplayCamera:
+    def __init__(self, source: "ReplaySource", max_frames: Optional[int]) -> None:
+        self.source: "ReplaySource" = source
+        self.max_frames: Optional[int] = max_frames
+        self.frames: int = 0
+        self.current_camera_type: str = "FILE"
+
+    def get_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Кадр из записи; по окончании - KeyboardInterrupt, на который старые версии завершают цикл"""
+        if self.source.finished or (self.max_frames is not None and self.frames >= self.max_frames):
+            raise KeyboardInterrupt
+        ret, frame = self.source.read()
+        if not ret:
+            raise KeyboardInterrupt
+        self.frames += 1
+        return ret, frame
+
+    def cleanup(self) -> None:
+        self.source.stop()
+
+def timed(timer: "StageTimer", name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with timer.stage(name):
+            return function(*args, **kwargs)
+    return wrapper
+
+def load_main_module(version_dir: str) -> Any:
+    """Импорт main.py выбранной версии вместо модулей текущей папки"""
+    version_dir = os.path.abspath(version_dir)
+    if version_dir != OWN_DIR:
+        for name, module in list(sys.modules.items()):
+            module_file = getattr(module, '__file__', None)
+            if module_file and os.path.dirname(os.path.abspath(module_file)) == OWN_DIR and name not in SHARED_MODULES and name != '__main__':
+                del sys.modules[name]
+        sys.path.insert(0, version_dir)
+    return importlib.import_module('main')
+
+def run_current(main_module: Any, args: Any) -> "StageTimer":
+    """Текущая версия: встроенные замеры этапов и сквозной задержки"""
+    camera_config = {'source': 'file', 'replay_path': args.footage, 'replay_mode': args.mode, 'replay_fps': args.fps, 'replay_loop': args.loop}
+    detector = main_module.HumanDetector(camera_config, headless=args.headless)
+    timer = detector.enable_profiling()
+    detector.show_camera_feed(max_frames=args.frames)
+    timer.frame_stats = detector.frame_stats()
+    return timer
+
+def run_legacy(main_module: Any, args: Any) -> "StageTimer":
+    """Старые версии (v1.2/v1.3): замеры через обертки методов, без сквозной задержки"""
+    timer = StageTimer()
+    replay_camera = ReplayCamera(ReplaySource(args.footage, args.mode, args.fps, args.loop), args.frames)
+    camera_get_frame = replay_camera.get_frame
+    def get_frame() -> Tuple[bool, Optional[np.ndarray]]:
+        with timer.stage('capture'):
+            result = camera_get_frame()
+        timer.frame_captured(replay_camera.frames)
+        return result
+    replay_camera.get_frame = get_frame
+    main_module.CameraController = lambda file_manager, log_maker: replay_camera
+    detector = main_module.HumanDetector()
+    detector.pose_detector.detect_and_draw_async = timed(timer, 'pose', detector.pose_detector.detect_and_draw_async)
+    detector.face_recognizer.process_faces = timed(timer, 'faces', detector.face_recognizer.process_faces)
+    detector.face_recognizer.draw_faces_and_message = timed(timer, 'draw_faces', detector.face_recognizer.draw_faces_and_message)
+    detector.update_detection_status = timed(timer, 'status', detector.update_detection_status)
+    detector.add_info_text = timed(timer, 'hud', detector.add_info_text)
+    imshow = main_module.cv2.imshow
+    main_module.cv2.imshow = timed(timer, 'imshow', imshow)
+    try:
+        detector.show_camera_feed()
+    finally:
+        main_module.cv2.imshow = imshow
+    return timer
+
+def print_report(report: Dict[str, Any]) -> None:
+    throughput = f"{report['throughput_fps']:.1f}" if report['throughput_fps'] else '-'
+    print(f"\nВерсия: {report['version']}, кадров: {report['frames']}, время: {report['wall_time_s']:.1f} с, пропускная способность: {throughput} FPS")
+    print(f"{'этап':>14} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    rows = [(name, stats) for name, stats in report['stages'].items()] + [(f"e2e_{name}", stats) for name, stats in report['end_to_end'].items()]
+    for name, stats in rows:
+        if stats['count']:
+            print(f"{name:>14} {stats['mean_ms']:>8.2f} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f}")
+    memory = report['memory']
+    if memory['peak_mb'] is not None:
+        print(f"Память: пик {memory['peak_mb']:.0f} МБ ({memory['source']})")
+
+def compare_reports(paths: List[str]) -> None:
+    """Сравнение p50/p95 этапов из нескольких JSON-отчетов"""
+    reports = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            reports.append(json.load(f))
+    names = []
+    for report in reports:
+        names += [name for name in report['stages'] if name not in names]
+        names += [f"e2e_{name}" for name in report['end_to_end'] if f"e2e_{name}" not in names]
+    print(f"{'этап':>14} " + " ".join(f"{report['version'][:17]:>17}" for report in reports))
+    print(f"{'throughput':>14} " + " ".join(f"{(report['throughput_fps'] or 0):>13.1f} FPS" for report in reports))
+    for name in names:
+        cells = []
+        for report in reports:
+            stats = report['end_to_end'].get(name[4:]) if name.startswith('e2e_') else report['stages'].get(name)
+            cells.append(f"{stats['p50_ms']:>8.2f}/{stats['p95_ms']:<8.2f}" if stats and stats['count'] else f"{'-':>17}")
+        print(f"{name:>14} " + " ".join(cells))
+
+if __name__ == "__main__":
+    import argparse
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="End-to-end HumanDetector benchmark on recorded footage")
+    parser.add_argument('footage', nargs='?', help="video file or folder with frames")
+    parser.add_argument('--mode', default='fast', choices=['native', 'fixed', 'fast'])
+    parser.add_argument('--fps', type=float, default=None, help="frame rate for --mode fixed")
+    parser.add_argument('--loop', action='store_true', help="repeat the footage until --frames is reached")
+    parser.add_argument('--frames', type=int, default=None, help="frame budget")
+    parser.add_argument('--headless', action='store_true', help="run the current version without drawing and display")
+    parser.add_argument('--version-dir', default=OWN_DIR, help="detector version to run (e.g. ../v1.3)")
+    parser.add_argument('--label', default=None, help="version label in the report")
+    parser.add_argument('--json', default=None, help="write the report to this JSON file")
+    parser.add_argument('--compare', nargs='+', default=None, metavar='REPORT', help="compare JSON reports instead of running")
+    args = parser.parse_args()
+    if args.compare:
+        compare_reports(args.compare)
+        raise SystemExit(0)
+    if not args.footage:
+        parser.error("footage is required")
+    args.footage = os.path.abspath(args.footage)
+    from replay_source import ReplaySource
+    from stage_timer import StageTimer
+    main_module = load_main_module(args.version_dir)
+    memory_sampler = MemorySampler()
+    memory_sampler.start()
+    if os.path.abspath(args.version_dir) == OWN_DIR:
+        timer = run_current(main_module, args)
+    else:
+        timer = run_legacy(main_module, args)
+    report = timer.summary()
+    report['frame_stats'] = getattr(timer, 'frame_stats', None)
+    report['version'] = args.label or os.path.basename(os.path.abspath(args.version_dir))
+    report['footage'] = args.footage
+    report['mode'] = args.mode
+    report['headless'] = args.headless
+    report['memory'] = memory_sampler.stop()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
\ No newline at end of file
@@ -3,31 +3,53 @@ import time
 import cv2
 import numpy as np
 import socket
+import selectors
+from collections import deque
+
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
+DECODE_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
 
 class Camera:
-    def __init__(self, timeout=0.5, ip='192.168.4.1', port=8888, video_buffer_size=65000, log_connection=True):
+    def __init__(self, timeout=0.5, ip='192.168.4.1', port=8888, video_buffer_size=65000, log_connection=True,
+                 max_frame_size=1048576, decode_reduce=1, decode_ring=3, link_timeout=2.0, reconnect_delay=0.1, max_reconnect_delay=5.0):
         self.ip = ip
         self.port = port
         self.timeout = timeout
         self.VIDEO_BUFFER_SIZE = video_buffer_size
+        self.link_timeout = link_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
         self.tcp = None
         self.udp = None
-        self._video_frame_buffer = None
+        self._selector = selectors.DefaultSelector()
+        self.state = 'DISCONNECTED'
+        self._video_frame_buffer = bytearray(video_buffer_size)
+        self._video_frame_view = memoryview(self._video_frame_buffer)
+        self._assembly = bytearray(max_frame_size)
+        self._assembly_length = 0
+        self._assembling = False
         self.raw_video_frame = None
+        self.frame_id = -1
+        self.frame_time = 0.0
+        self._new_frame = threading.Condition()
+        self.decode_flags = DECODE_FLAGS.get(decode_reduce, cv2.IMREAD_COLOR)
+        self._decode_lock = threading.Lock()
+        self._decoded_frame = None
+        self._decoded_id = -1
+        self.decoded_frames = deque(maxlen=decode_ring)
+        self._new_decoded = threading.Condition()
+        self._decoding_thread = None
+        self.stats = {'datagrams': 0, 'bytes': 0, 'frames': 0, 'dropped': 0, 'decoded': 0, 'decode_errors': 0, 'decode_skipped': 0, 'decode_time': 0.0,
+                      'connects': 0, 'reconnects': 0, 'reconnect_attempts': 0, 'timeouts': 0, 'errors': 0}
         self.connected = None
         self.log_connection = log_connection
         self._thread_stop = threading.Event()
         self._thread_stop.set()
 
-        for i in range(15):
-            if not self.connected:
-                self.connected = self.reconnect()
-                if self.log_connection:
-                    print('Camera CONNECTED')
-                break
-            else:
-                if self.log_connection:
-                    print('Camera DISCONNECTED')
+        self.connected = self._try_connect()
+        if self.log_connection:
+            print('Camera CONNECTED' if self.connected else 'Camera DISCONNECTED')
         self.connect()
         time.sleep(2)
 
@@ -54,23 +76,26 @@ class Camera:
         """Disconnect."""
         self._thread_stop.set()
         self.connected = False
-        if self.tcp is not None:
-            self.tcp.close()
-            self.tcp = None
-        if self.udp is not None:
-            self.udp.close()
-            self.udp = None
+        self.state = 'DISCONNECTED'
+        self._close_sockets()
         if self.log_connection:
             print('Camera DISCONNECTED')
 
-    def reconnect(self):
-        """Connect to TCP and UDP sockets. Creates new ones if necessary."""
-        if self.tcp is not None:
-            self.tcp.close()
-            self.tcp = None
+    def _close_sockets(self):
         if self.udp is not None:
+            try:
+                self._selector.unregister(self.udp)
+            except (KeyError, ValueError):
+                pass
             self.udp.close()
             self.udp = None
+        if self.tcp is not None:
+            self.tcp.close()
+            self.tcp = None
+
+    def reconnect(self):
+        """Connect to TCP and UDP sockets. Creates new ones if necessary."""
+        self._close_sockets()
         self.tcp = self.new_tcp()
         self.udp = self.new_udp()
         try:
@@ -78,33 +103,123 @@ class Camera:
             self.udp.bind(self.tcp.getsockname())
         except:
             return False
+        self._selector.register(self.udp, selectors.EVENT_READ)
+        return True
+
+    def _try_connect(self):
+        """Single connection attempt with counters and state updates."""
+        self.state = 'CONNECTING'
+        self.stats['reconnect_attempts'] += 1
+        if not self.reconnect():
+            self.state = 'DISCONNECTED'
+            return False
+        self.state = 'CONNECTED'
+        self.stats['connects'] += 1
+        if self.stats['connects'] > 1:
+            self.stats['reconnects'] += 1
         return True
 
+    def _connection_lost(self):
+        self._close_sockets()
+        self._assembling = False
+        if self.connected:
+            self.connected = False
+            self.state = 'DISCONNECTED'
+            if self.log_connection:
+                print('Camera DISCONNECTED')
+
     def _getting_frames(self):
-        while True:
-            if self._thread_stop.is_set():
-                break
+        """
+        Receive loop: waits for datagrams with a selector, treats link_timeout seconds of silence as a lost link
+        and reconnects with exponential backoff (reconnect_delay doubling up to max_reconnect_delay).
+        """
+        delay = self.reconnect_delay
+        last_data_time = time.time()
+        while not self._thread_stop.is_set():
             if not self.connected:
-                while not self.reconnect():
-                    pass
+                if not self._try_connect():
+                    self._thread_stop.wait(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                    continue
                 self.connected = True
+                delay = self.reconnect_delay
+                last_data_time = time.time()
                 if self.log_connection:
                     print('Camera CONNECTED')
             try:
-                self._video_frame_buffer = self.udp.recv(self.VIDEO_BUFFER_SIZE)
-                end = self._video_frame_buffer.rfind(b'\xff\xd9')
-                if end == -1:
+                if not self._selector.select(self.timeout):
+                    self.stats['timeouts'] += 1
+                    if time.time() - last_data_time >= self.link_timeout:
+                        self._connection_lost()
                     continue
-                self._video_frame_buffer = self._video_frame_buffer[:end + 2]
-                beginning = self._video_frame_buffer.rfind(b'\xff\xd8')
+                received = self.udp.recv_into(self._video_frame_view)
+                last_data_time = time.time()
+                self.stats['datagrams'] += 1
+                self.stats['bytes'] += received
+                self._feed(received)
+            except Exception:
+                if self._thread_stop.is_set():
+                    break
+                self.stats['errors'] += 1
+                self._connection_lost()
+
+    def _append(self, start, end):
+        """Appends datagram bytes [start, end) to the frame being assembled."""
+        length = end - start
+        if self._assembly_length + length > len(self._assembly):
+            self._assembling = False
+            self.stats['dropped'] += 1
+            return False
+        self._assembly[self._assembly_length:self._assembly_length + length] = self._video_frame_view[start:end]
+        self._assembly_length += length
+        return True
+
+    def _complete_frame(self):
+        """Publishes the assembled JPEG and tags it with the next sequence number."""
+        frame = bytes(memoryview(self._assembly)[:self._assembly_length])
+        self._assembling = False
+        with self._new_frame:
+            self.raw_video_frame = frame
+            self.frame_id += 1
+            self.frame_time = time.time()
+            self.stats['frames'] += 1
+            self._new_frame.notify_all()
+
+    def _feed(self, received):
+        """
+        Reassembles JPEG frames that may span several datagrams.
+        A new SOI marker before the EOI of the current frame drops the incomplete frame.
+        """
+        buffer = self._video_frame_buffer
+        position = 0
+        if self._assembling and received and self._assembly_length and self._assembly[self._assembly_length - 1] == 0xff and buffer[0] == 0xd9:
+            if self._append(0, 1):
+                self._complete_frame()
+            position = 1
+        while position < received:
+            if not self._assembling:
+                beginning = buffer.find(JPEG_SOI, position, received)
                 if beginning == -1:
-                    continue
-                self.raw_video_frame = self._video_frame_buffer[beginning:]
-            except:
-                if self.connected:
-                    self.connected = False
-                    if self.log_connection:
-                        print('Camera DISCONNECTED')
+                    return
+                self._assembling = True
+                self._assembly_length = 0
+                position = beginning
+                scan_from = beginning + 2
+            else:
+                scan_from = position
+            end = buffer.find(JPEG_EOI, scan_from, received)
+            restart = buffer.find(JPEG_SOI, scan_from, received if end == -1 else end)
+            if restart != -1:
+                self.stats['dropped'] += 1
+                self._assembling = False
+                position = restart
+                continue
+            if end == -1:
+                self._append(position, received)
+                return
+            if self._append(position, end + 2):
+                self._complete_frame()
+            position = end + 2
 
     def get_frame(self):
         """
@@ -113,16 +228,101 @@ class Camera:
         """
         return self.raw_video_frame
 
+    def wait_frame(self, last_id, timeout=None):
+        """
+        Waits for a frame newer than last_id.
+        :return: (raw_frame, frame_id, frame_time), raw_frame is None if no new frame arrived in time
+        """
+        with self._new_frame:
+            if self.frame_id <= last_id:
+                self._new_frame.wait_for(lambda: self.frame_id > last_id, timeout)
+            if self.frame_id <= last_id:
+                return None, self.frame_id, self.frame_time
+            return self.raw_video_frame, self.frame_id, self.frame_time
+
+    def _decode(self, raw_frame, frame_id):
+        """Decodes each frame once; repeated calls for the same frame return the cached (read-only) image."""
+        with self._decode_lock:
+            if frame_id != self._decoded_id:
+                start = time.perf_counter()
+                frame = cv2.imdecode(np.frombuffer(raw_frame, dtype=np.uint8), self.decode_flags)
+                self.stats['decode_time'] += time.perf_counter() - start
+                if frame is None:
+                    self.stats['decode_errors'] += 1
+                else:
+                    self.stats['decoded'] += 1
+                    frame.flags.writeable = False
+                self._decoded_frame, self._decoded_id = frame, frame_id
+            return self._decoded_frame
+
     def get_cv_frame(self):
         """
         Returns decoded frame.
         :return: cv_frame or None
         """
-        frame = self.get_frame()
+        with self._new_frame:
+            frame, frame_id = self.raw_video_frame, self.frame_id
         if frame is not None:
-            frame = cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_COLOR)
+            frame = self._decode(frame, frame_id)
         return frame
 
+    def wait_cv_frame(self, last_id, timeout=None):
+        """
+        Waits for a frame newer than last_id and decodes it.
+        :return: (cv_frame, frame_id, frame_time), cv_frame is None if no new frame arrived in time or decoding failed
+        """
+        raw_frame, frame_id, frame_time = self.wait_frame(last_id, timeout)
+        if raw_frame is None:
+            return None, frame_id, frame_time
+        return self._decode(raw_frame, frame_id), frame_id, frame_time
+
+    def start_decoding(self):
+        """Starts the decoding thread that keeps the newest decoded frames in decoded_frames."""
+        if self._decoding_thread is not None and self._decoding_thread.is_alive():
+            return
+        self._decoding_thread = threading.Thread(target=self._decoding_frames, daemon=True)
+        self._decoding_thread.start()
+
+    def _decoding_frames(self):
+        last_id = -1
+        while not self._thread_stop.is_set():
+            raw_frame, frame_id, frame_time = self.wait_frame(last_id, self.timeout)
+            if raw_frame is None:
+                continue
+            if last_id >= 0 and frame_id > last_id + 1:
+                self.stats['decode_skipped'] += frame_id - last_id - 1
+            last_id = frame_id
+            frame = self._decode(raw_frame, frame_id)
+            if frame is None:
+                continue
+            with self._new_decoded:
+                self.decoded_frames.append((frame, frame_id, frame_time))
+                self._new_decoded.notify_all()
+
+    def wait_decoded_frame(self, last_id, timeout=None):
+        """
+        Waits for the decoding thread to publish a frame newer than last_id.
+        :return: (cv_frame, frame_id, frame_time) of the newest decoded frame, cv_frame is None on timeout
+        """
+        with self._new_decoded:
+            newer = lambda: self.decoded_frames and self.decoded_frames[-1][1] > last_id
+            if not newer():
+                self._new_decoded.wait_for(newer, timeout)
+            if not newer():
+                return None, last_id, 0.0
+            return self.decoded_frames[-1]
+
+    def get_stats(self):
+        """
+        Returns receiver and decoder counters.
+        :return: dict with connection state, connects, reconnects, reconnect_attempts, timeouts, errors, datagrams, bytes,
+                 frames, dropped, decoded, decode_errors, decode_skipped and mean decode_ms
+        """
+        stats = dict(self.stats)
+        stats['state'] = self.state
+        stats['decode_ms'] = stats.pop('decode_time') * 1000 / stats['decoded'] if stats['decoded'] else None
+        return stats
+
 
 class VideoStream:
     def __init__(self, logger=True):
@@ -154,14 +354,13 @@ class VideoStream:
                 cv2.destroyAllWindows()
                 break
 
-            # Try to receive a frame
-            camera_frame = self.camera.get_frame()
+            # Try to receive and decode a frame
+            camera_frame = self.camera.get_cv_frame()
 
             if camera_frame is None:
                 if self.logger:
                     print("No frame")
                 continue
 
-            # Decode and render JPEG frame
-            camera_frame = cv2.imdecode(np.frombuffer(camera_frame, dtype=np.uint8), cv2.IMREAD_COLOR)
+            # Render JPEG frame
             cv2.imshow('pioneer_camera_stream', camera_frame)
\ No newline at end of file
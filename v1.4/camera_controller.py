@@ -1,18 +1,35 @@
 from imports import *
 from video_getter import VideoGetter
+from replay_source import ReplaySource
+from config import CAMERA_CONFIG
 
 class CameraController:
-    def __init__(self, file_manager: Any, log_maker: Any) -> None:
+    def __init__(self, file_manager: Any, log_maker: Any, camera_config: Optional[Dict[str, Any]] = None) -> None:
         self.file_manager: Any = file_manager
         self.log_maker: Any = log_maker
         self.logfile_name: str = self.file_manager.get_logfile_name()
+        self.camera_config: Dict[str, Any] = camera_config if camera_config is not None else CAMERA_CONFIG
         self.drone_connected: bool = False
         self.laptop_camera: Optional[Any] = None
+        self.replay_camera: Optional[ReplaySource] = None
         self.current_camera_type: str = "NONE"
+        self.last_source_id: int = -1 # номер последнего выданного кадра в нумерации текущего источника
+        self.id_offset: int = 0 # сдвиг нумерации источника к сквозной (растет при смене камеры)
+        self.last_frame_id: int = -1
+        self.simulation_frames: int = 0
         self.init_cameras()
 
     def init_cameras(self) -> None:
-        """Инициализация камер в порядке приоритета: дрон -> ПК"""
+        """Инициализация камер в порядке приоритета: дрон -> ПК (или только выбранный источник)"""
+        source = self.camera_config.get('source', 'auto')
+        if source == 'file':
+            self.replay_camera = self.init_replay_camera()
+            self.current_camera_type = "FILE" if self.replay_camera is not None else "NONE"
+            return
+        if source == 'pc':
+            self.laptop_camera = self.init_laptop_camera()
+            self.current_camera_type = "PC" if self.laptop_camera is not None else "NONE"
+            return
         self.drone_connected = self.init_drone_camera()
         if self.drone_connected:
             self.current_camera_type = "DRONE"
@@ -31,7 +48,9 @@ class CameraController:
         """Инициализация камеры дрона"""
         try:
             from cam1 import Camera
-            self.pioneer_cam = Camera()
+            self.pioneer_cam = Camera(decode_reduce=self.camera_config.get('drone_decode_reduce', 1))
+            if self.camera_config.get('drone_decode_thread', True):
+                self.pioneer_cam.start_decoding()
             return True
         except ImportError as e:
             self.log_maker.writelog(self.logfile_name, f'Libraries input error:\n{e}')
@@ -42,6 +61,21 @@ class CameraController:
             print(f"❌ Ошибка подключения к дрону: {e}")
             return False
 
+    def init_replay_camera(self) -> Optional[ReplaySource]:
+        """Инициализация воспроизведения записи (видеофайл или папка с кадрами)"""
+        path = self.camera_config.get('replay_path')
+        try:
+            replay = ReplaySource(path, self.camera_config.get('replay_mode', 'native'), self.camera_config.get('replay_fps'), self.camera_config.get('replay_loop', False))
+            if replay.isOpened():
+                self.log_maker.writelog(self.logfile_name, f'Replay camera initialised ({path}, {replay.mode}, {replay.fps:.1f} FPS).')
+                return replay.start()
+            self.log_maker.writelog(self.logfile_name, f'Replay source not found: {path}.')
+            return None
+        except Exception as e:
+            self.log_maker.writelog(self.logfile_name, f'Replay camera initialisation error:\n{e}')
+            print(f"❌ Ошибка открытия записи: {e}")
+            return None
+
     def init_laptop_camera(self) -> Optional[Any]:
         """Инициализация встроенной камеры ПК"""
         try:
@@ -67,56 +101,98 @@ class CameraController:
 
     def get_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
         """Получение кадра с текущей камеры"""
+        ret, frame, _, _ = self.read_frame()
+        return ret, frame
+
+    def read_frame(self, timeout: float = 0.1) -> Tuple[bool, Optional[np.ndarray], int, float]:
+        """Новый кадр текущей камеры (ожидание до timeout), его сквозной номер и время захвата"""
+        ret, frame, source_id, timestamp = self._read_current(timeout)
+        if not ret:
+            return False, None, self.last_frame_id, timestamp
+        self.last_source_id = source_id
+        self.last_frame_id = self.id_offset + source_id
+        return True, frame, self.last_frame_id, timestamp
+
+    def _read_current(self, timeout: float) -> Tuple[bool, Optional[np.ndarray], int, float]:
         if self.current_camera_type == "DRONE":
-            return self.get_drone_frame()
+            return self.get_drone_frame(timeout)
         elif self.current_camera_type == "PC":
-            return self.get_laptop_frame()
+            return self.get_laptop_frame(timeout)
+        elif self.current_camera_type == "FILE":
+            return self.get_replay_frame()
         else:
             return self.get_simulation_frame()
 
-    def get_drone_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+    def get_drone_frame(self, timeout: float) -> Tuple[bool, Optional[np.ndarray], int, float]:
         """Получение кадра с камеры дрона"""
         try:
-            frame = self.pioneer_cam.get_cv_frame()
+            if self.camera_config.get('drone_decode_thread', True):
+                frame, source_id, timestamp = self.pioneer_cam.wait_decoded_frame(self.last_source_id, timeout)
+            else:
+                frame, source_id, timestamp = self.pioneer_cam.wait_cv_frame(self.last_source_id, timeout)
+            if frame is None and self.pioneer_cam.get_frame() is not None:
+                return False, None, source_id, timestamp
             if frame is not None and frame.size > 0:
-                return True, frame
+                return True, frame, source_id, timestamp
             else:
                 self.log_maker.writelog(self.logfile_name, 'Drone camera unavainable, switching to PC camera...')
                 self.switch_to_laptop_camera()
-                return self.get_frame()
+                return self._read_current(timeout)
         except Exception as e:
             self.log_maker.writelog(self.logfile_name, f'Drone camera error, switching to PC camera...\n{e}')
             self.switch_to_laptop_camera()
-            return self.get_frame()
+            return self._read_current(timeout)
 
-    def get_laptop_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+    def get_laptop_frame(self, timeout: float) -> Tuple[bool, Optional[np.ndarray], int, float]:
         """Получение кадра с встроенной камеры ноутбука"""
         try:
             if self.laptop_camera is not None:
-                ret, frame = self.laptop_camera.read()
+                ret, frame, source_id, timestamp = self.laptop_camera.read_frame(self.last_source_id, timeout)
                 if ret and frame is not None:
-                    return True, frame
+                    if source_id <= self.last_source_id:
+                        return False, None, source_id, timestamp
+                    return True, frame, source_id, timestamp
                 else:
                     self.log_maker.writelog(self.logfile_name, 'Error while reading frame from PC camera.')
-                    return False, None
+                    return False, None, source_id, timestamp
             else:
                 return self.get_simulation_frame()
         except Exception as e:
             self.log_maker.writelog(self.logfile_name, f'PC camera error:\n{e}')
             return self.get_simulation_frame()
 
-    def get_simulation_frame(self) -> Tuple[bool, Optional[np.ndarray]]:
+    def get_replay_frame(self) -> Tuple[bool, Optional[np.ndarray], int, float]:
+        """Получение кадра из записи (пропущенные при отставании кадры учитываются в номере)"""
+        ret, frame = self.replay_camera.read()
+        if not ret and self.replay_camera.finished:
+            self.log_maker.writelog(self.logfile_name, f'Replay finished after {self.replay_camera.frames_read} frames.')
+        return ret, frame, self.replay_camera.sequence - 1, time.time()
+
+    def is_finished(self) -> bool:
+        """Источник кадров исчерпан (конец записи без повтора)"""
+        return self.current_camera_type == "FILE" and self.replay_camera.finished
+
+    def get_simulation_frame(self) -> Tuple[bool, Optional[np.ndarray], int, float]:
         """Создание тестового кадра если камеры недоступны"""
         frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
         cv2.putText(frame, "SIMULATION MODE - NO CAMERA", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
         cv2.putText(frame, "Press 'q' to exit", (50, 280), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        return True, frame
+        self.simulation_frames += 1
+        return True, frame, self.simulation_frames - 1, time.time()
+
+    def get_camera_stats(self) -> Dict[str, Any]:
+        """Счетчики приема, декодирования и переподключений камеры дрона (пусто для других камер)"""
+        if hasattr(self, 'pioneer_cam'):
+            return self.pioneer_cam.get_stats()
+        return {}
 
     def switch_to_laptop_camera(self) -> None:
         """Переключение на камеру ноутбука"""
         if self.current_camera_type == "DRONE":
             self.drone_connected = False
             self.current_camera_type = "PC"
+            self.id_offset = self.last_frame_id + 1
+            self.last_source_id = -1
             if self.laptop_camera is None:
                 self.laptop_camera = self.init_laptop_camera()
             self.log_maker.writelog(self.logfile_name, 'Switching to PC camera...')
@@ -125,10 +201,16 @@ class CameraController:
         """Очистка ресурсов всех камер"""
         if hasattr(self, 'pioneer_cam'):
             try:
+                stats = self.get_camera_stats()
+                self.log_maker.writelog(self.logfile_name, f"Drone camera: {stats['frames']} frames received, {stats['dropped']} dropped, {stats['decoded']} decoded, {stats['decode_errors']} decode errors, {stats['decode_skipped']} skipped by the decoder.")
+                self.log_maker.writelog(self.logfile_name, f"Drone link: {stats['reconnects']} reconnects, {stats['reconnect_attempts']} connection attempts, {stats['timeouts']} receive timeouts, {stats['errors']} errors, {stats['bytes']} bytes received.")
                 self.pioneer_cam.disconnect()
                 self.log_maker.writelog(self.logfile_name, 'Drone disconnected.')
             except Exception as e:
                 self.log_maker.writelog(self.logfile_name, f'Drone disconnection error:\n{e}')
+        if self.replay_camera is not None:
+            self.replay_camera.stop()
+            self.log_maker.writelog(self.logfile_name, 'Replay camera closed.')
         if self.laptop_camera is not None:
             if isinstance(self.laptop_camera, VideoGetter):
                 self.laptop_camera.stop()
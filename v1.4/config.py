@@ -1,5 +1,15 @@
 from imports import *
 
+CAMERA_CONFIG = {
+    'source': 'auto', # 'auto' (drone -> PC), 'pc' or 'file'
+    'replay_path': None, # video file or folder with frames for 'file'
+    'replay_mode': 'native', # 'native' (recorded FPS), 'fixed' (replay_fps) or 'fast' (no pacing)
+    'replay_fps': 30.0,
+    'replay_loop': False,
+    'drone_decode_reduce': 1, # 1, 2, 4 or 8 - JPEG кадры дрона декодируются сразу в уменьшенном размере
+    'drone_decode_thread': True # декодирование кадров дрона в отдельном потоке параллельно с обработкой
+}
+
 MEDIAPIPE_CONFIG = {
     'static_image_mode': False,
     'min_tracking_confidence': 0.5,
@@ -10,19 +20,67 @@ MEDIAPIPE_CONFIG = {
 FACE_RECOGNITION_CONFIG = {
     'tolerance': 0.5,
     'cooldown_time': 5,
-    'model': 'hog' # 'hog' (faster, CPU) or 'cnn' (slower, GPU/CUDA required)
+    'model': 'hog', # 'hog' (быстрее, CPU) или 'cnn' (медленнее, нужен GPU/CUDA)
+    'detection_scale': 1.0, # поиск лиц на кадре, масштабированном этим коэффициентом (0.5 - вдвое меньше); кодировки - по полному кадру
+    'index': 'brute', # 'brute' (точный перебор) или 'ivf' (приближенный, для баз от 100 тыс. лиц)
+    'ivf_min_size': 20000, # меньшие базы - всегда перебор; тип индекса выбирается заново при обновлении базы
+    'ivf_lists': None, # число списков IVF, None - sqrt(N)
+    'ivf_probe': 8, # больше просматриваемых списков - выше полнота, медленнее поиск
+    'reload_interval': 5.0, # секунд между проверками faces_database, None - без обновления на лету
+    'tracking': True, # сопровождение лиц оптическим потоком между распознаваниями; требует все кадры подряд, поэтому face_workers не действует (один обработчик)
+    'detect_interval': 10, # кадров между полными распознаваниями, пока все лица сопровождаются
+    'full_scan_interval': 15 # кадров между поисками по всему кадру, когда есть области головы от Pose
+}
+
+ENROLLMENT_CONFIG = {
+    'enroll_on_start': True, # построение кэша кодировок пулом процессов до запуска face_worker
+    'workers': None, # None - все ядра
+    'chunksize': 8
 }
 
 ASYNC_CONFIG = {
     'pose_processing': True,
+    'pose_workers': 1, # процессы MediaPipe Pose (None - половина ядер); кадры раздаются свободным по кругу, показывается самый новый результат
     'face_processing': True,
+    'face_workers': 1, # процессы распознавания лиц; общая база кодировок (memory-map), кэш обновляет только первый; при FACE_RECOGNITION_CONFIG['tracking'] - всегда один
     'max_queue_size': 2,
     'processing_timeout': 2.0
 }
 
+FRAME_TRANSPORT_CONFIG = {
+    'shared_memory': True, # кадры передаются обработчикам через кольцо слотов в разделяемой памяти
+    'slots': 8,
+    'max_width': 1920,
+    'max_height': 1080
+}
+
+IMAGE_WRITER_CONFIG = {
+    'format': 'jpg', # jpg, webp или png
+    'quality': 90, # качество jpg/webp (0-100) или степень сжатия png (0-9)
+    'queue_size': 8, # кадров в очереди записи на процесс
+    'drop_policy': 'drop_oldest', # при медленном диске: drop_oldest, drop_new или block (ожидание до block_timeout)
+    'block_timeout': 0.1,
+    'threads': 1
+}
+
+LOG_CONFIG = {
+    'flush_interval': 1.0, # секунд между сбросами буфера лога на диск
+    'flush_size': 65536, # байт в буфере, после которых сброс выполняется сразу
+    'queue_size': 10000 # строк в очереди записи (при переполнении строки отбрасываются и учитываются)
+}
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_FOLDER = os.path.join(BASE_DIR, "database")
 PHOTOS_FOLDER = os.path.join(DATABASE_FOLDER, "recognized_humans")
 FACES_FOLDER = os.path.join(DATABASE_FOLDER, "recognized_faces")
 LOGS_FOLDER = os.path.join(DATABASE_FOLDER, "logs")
-DATABASE_PATH = os.path.join(DATABASE_FOLDER, "faces_database")
\ No newline at end of file
+DATABASE_PATH = os.path.join(DATABASE_FOLDER, "faces_database")
+ENCODING_CACHE_PATH = os.path.join(DATABASE_FOLDER, "encodings_cache")
+
+EVENT_LOG_CONFIG = {
+    'enabled': True,
+    'path': os.path.join(DATABASE_FOLDER, "events", "events.jsonl"), # журнал событий дописывается между запусками; рядом - разреженный индекс .idx
+    'index_bytes': 262144, # запись индекса (смещение и время) на каждые index_bytes журнала
+    'flush_interval': 1.0,
+    'face_events': True # события face_worker: face_detected на каждое обнаружение детектором (кадры трекера не пишутся), face_saved после записи файла снимка
+}
\ No newline at end of file
@@ -0,0 +1,253 @@
+from imports import *
+from face_matcher import ENCODING_SIZE, rebase_face_matcher
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+STALE_GENERATION_DELAY = 30.0 # секунд после записи нового поколения, за которые все процессы успевают перейти на него
+
+def list_database_images(database_path: str) -> List[str]:
+    """Список изображений в папке базы лиц"""
+    if not os.path.exists(database_path):
+        return []
+    return sorted(filename for filename in os.listdir(database_path) if filename.lower().endswith(IMAGE_EXTENSIONS))
+
+def file_hash(filepath: str) -> str:
+    """SHA-1 содержимого файла"""
+    sha1 = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def encode_image(filepath: str) -> Optional[np.ndarray]:
+    """Кодировка первого лица на изображении (None если лицо не найдено)"""
+    image = face_recognition.load_image_file(filepath)
+    encodings = face_recognition.face_encodings(image)
+    if not encodings:
+        return None
+    return np.asarray(encodings[0], dtype=np.float32)
+
+def encode_files(filepaths: List[str]) -> Tuple[Dict[str, Optional[np.ndarray]], Dict[str, str]]:
+    """Последовательное кодирование файлов: (кодировки, ошибки)"""
+    encodings: Dict[str, Optional[np.ndarray]] = {}
+    errors: Dict[str, str] = {}
+    for filepath in filepaths:
+        try:
+            encodings[filepath] = encode_image(filepath)
+        except Exception as e:
+            errors[filepath] = str(e)
+    return encodings, errors
+
+class StoreUpdate(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    errors: Dict[str, str]
+
+class EncodingStore:
+    def __init__(self, database_path: str, cache_path: str) -> None:
+        self.database_path: str = database_path
+        self.cache_path: str = cache_path
+        self.manifest_path: str = os.path.join(cache_path, MANIFEST_FILE)
+
+    def _empty_manifest(self) -> Dict[str, Any]:
+        return {'version': MANIFEST_VERSION, 'generation': 0, 'matrix': None, 'names': [], 'files': {}}
+
+    def read_manifest(self) -> Dict[str, Any]:
+        """Чтение манифеста кэша (пустой манифест если кэш отсутствует или поврежден)"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != MANIFEST_VERSION:
+                return self._empty_manifest()
+            return manifest
+        except (OSError, ValueError):
+            return self._empty_manifest()
+
+    def _matrix_path(self, manifest: Dict[str, Any]) -> Optional[str]:
+        if not manifest.get('matrix'):
+            return None
+        return os.path.join(self.cache_path, manifest['matrix'])
+
+    def load(self, manifest: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, List[str]]:
+        """Загрузка матрицы кодировок (memory-map) и списка имен"""
+        if manifest is None:
+            manifest = self.read_manifest()
+        names: List[str] = list(manifest['names'])
+        matrix_path = self._matrix_path(manifest)
+        if not names or matrix_path is None:
+            return np.empty((0, ENCODING_SIZE), dtype=np.float32), []
+        try:
+            encodings = np.load(matrix_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return np.empty((0, ENCODING_SIZE), dtype=np.float32), []
+        if encodings.shape != (len(names), ENCODING_SIZE):
+            return np.empty((0, ENCODING_SIZE), dtype=np.float32), []
+        return encodings, names
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        files: Dict[str, Tuple[float, int]] = {}
+        for filename in list_database_images(self.database_path):
+            try:
+                stat = os.stat(os.path.join(self.database_path, filename))
+            except OSError:
+                continue
+            files[filename] = (stat.st_mtime, stat.st_size)
+        return files
+
+    def prune(self, delay: float = STALE_GENERATION_DELAY) -> List[str]:
+        """Удаление матриц прошлых поколений, когда после записи текущего прошло delay секунд и читатели перешли на него.
+        Файлы, которые удалить не удалось (в Windows - еще открыты другим процессом), возвращаются и удаляются при следующем вызове"""
+        manifest = self.read_manifest()
+        try:
+            if time.time() - os.stat(self.manifest_path).st_mtime < delay:
+                return []
+            filenames = os.listdir(self.cache_path)
+        except OSError:
+            return []
+        pending: List[str] = []
+        for filename in filenames:
+            if filename.startswith("encodings_") and filename != manifest.get('matrix'):
+                try:
+                    os.remove(os.path.join(self.cache_path, filename))
+                except OSError:
+                    pending.append(filename)
+        return pending
+
+    def sync(self, encode_function: Callable[[List[str]], Tuple[Dict[str, Optional[np.ndarray]], Dict[str, str]]] = encode_files) -> StoreUpdate:
+        """Инкрементальное обновление кэша: кодируются только новые и измененные файлы; прошлые поколения матрицы удаляются"""
+        self.prune()
+        manifest = self.read_manifest()
+        encodings, names = self.load(manifest)
+        known: Dict[str, Dict[str, Any]] = manifest['files'] if names or not manifest['names'] else {}
+        rows: Dict[str, int] = {name: row for row, name in enumerate(names)}
+        current = self._scan()
+        removed = [filename for filename in known if filename not in current]
+        to_encode: List[str] = []
+        new_files: Dict[str, Dict[str, Any]] = {}
+        for filename, (mtime, size) in current.items():
+            entry = known.get(filename)
+            if entry is not None and entry['mtime'] == mtime and entry['size'] == size:
+                new_files[filename] = entry
+                continue
+            try:
+                digest = file_hash(os.path.join(self.database_path, filename))
+            except OSError:
+                continue
+            if entry is not None and entry['sha1'] == digest:
+                new_files[filename] = dict(entry, mtime=mtime, size=size)
+                continue
+            new_files[filename] = {'mtime': mtime, 'size': size, 'sha1': digest, 'has_face': False, 'error': False}
+            to_encode.append(filename)
+        changed = [filename for filename in to_encode if filename in rows]
+        new_encodings: Dict[str, np.ndarray] = {}
+        errors: Dict[str, str] = {}
+        if to_encode:
+            paths = {os.path.join(self.database_path, filename): filename for filename in to_encode}
+            encoded, path_errors = encode_function(list(paths.keys()))
+            for path, error in path_errors.items():
+                filename = paths[path]
+                errors[filename] = error
+                new_files[filename]['error'] = True # не кодируется повторно, пока не изменится содержимое файла
+            for path, encoding in encoded.items():
+                filename = paths[path]
+                if encoding is not None:
+                    new_encodings[filename] = encoding
+                    new_files[filename]['has_face'] = True
+        dropped = set(removed) | set(changed) | set(errors)
+        if not new_encodings and not dropped and new_files == known:
+            return StoreUpdate([], [], errors)
+        kept_names = [name for name in names if name not in dropped and name in new_files]
+        kept_rows = np.array([rows[name] for name in kept_names], dtype=np.int64)
+        added_names = sorted(new_encodings.keys())
+        parts = [np.asarray(encodings[kept_rows], dtype=np.float32).reshape(-1, ENCODING_SIZE)]
+        if added_names:
+            parts.append(np.stack([new_encodings[name] for name in added_names]).astype(np.float32))
+        self._write(manifest, np.concatenate(parts), kept_names + added_names, new_files)
+        removed_names = [name for name in names if name in dropped or name not in new_files]
+        return StoreUpdate(added_names, removed_names, errors)
+
+    def _write(self, manifest: Dict[str, Any], encodings: np.ndarray, names: List[str], files: Dict[str, Dict[str, Any]]) -> None:
+        """Атомарная запись новой матрицы и манифеста (прошлое поколение остается для процессов, которые еще не перешли на новое)"""
+        if not os.path.exists(self.cache_path):
+            os.makedirs(self.cache_path)
+        generation = manifest.get('generation', 0) + 1
+        matrix_name = f"encodings_{generation}.npy"
+        tmp_matrix_path = os.path.join(self.cache_path, matrix_name + ".tmp")
+        with open(tmp_matrix_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(encodings, dtype=np.float32))
+        os.replace(tmp_matrix_path, os.path.join(self.cache_path, matrix_name))
+        new_manifest = {'version': MANIFEST_VERSION, 'generation': generation, 'matrix': matrix_name, 'names': names, 'files': files}
+        tmp_manifest_path = self.manifest_path + ".tmp"
+        with open(tmp_manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(new_manifest, f, ensure_ascii=False)
+        os.replace(tmp_manifest_path, self.manifest_path)
+
+class DatabaseWatcher:
+    def __init__(self, store: EncodingStore, matcher: Any, interval: float = 5.0, owner: bool = True,
+                 matcher_config: Optional[Dict[str, Any]] = None) -> None:
+        self.store: EncodingStore = store
+        self.matcher: Any = matcher
+        self.matcher_config: Optional[Dict[str, Any]] = matcher_config # настройки индекса: тип выбирается заново при каждой подмене базы
+        self.interval: float = interval
+        self.owner: bool = owner # кэш обновляет только владелец, остальные процессы подхватывают новые поколения
+        self.generation: int = store.read_manifest().get('generation', 0)
+        self.manifest_mtime: int = self._manifest_mtime()
+        self._stop: threading.Event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Запуск фонового опроса папки базы лиц"""
+        if self.thread is not None:
+            return
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._watch, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Ошибка обновления базы лиц: {e}")
+
+    def _manifest_mtime(self) -> int:
+        try:
+            return os.stat(self.store.manifest_path).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _reload(self, manifest: Optional[Dict[str, Any]] = None) -> None:
+        """Подмена сопоставителя копией на новой матрице кэша (memory-map); при пересечении ivf_min_size - смена индекса"""
+        if manifest is None:
+            manifest = self.store.read_manifest()
+        encodings, names = self.store.load(manifest)
+        if self.matcher_config is not None:
+            self.matcher = rebase_face_matcher(self.matcher, self.matcher_config, encodings, names)
+        else:
+            self.matcher = self.matcher.rebased(encodings, names)
+        self.generation = manifest.get('generation', 0)
+
+    def poll(self) -> StoreUpdate:
+        """Синхронизация кэша (владелец) или проверка нового поколения матрицы и подмена сопоставителя"""
+        if not self.owner:
+            manifest_mtime = self._manifest_mtime()
+            if manifest_mtime != self.manifest_mtime:
+                self.manifest_mtime = manifest_mtime
+                manifest = self.store.read_manifest()
+                if manifest.get('generation', 0) != self.generation:
+                    self._reload(manifest)
+            return StoreUpdate([], [], {})
+        update = self.store.sync()
+        for filename, error in update.errors.items():
+            print(f"❌ Ошибка кодирования {filename}: {error}")
+        if update.added or update.removed:
+            self._reload()
+            print(f"🔄 База лиц обновлена: +{len(update.added)} -{len(update.removed)}")
+        return update
\ No newline at end of file
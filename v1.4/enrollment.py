@@ -0,0 +1,80 @@
+from imports import *
+from config import DATABASE_PATH, ENCODING_CACHE_PATH, ENROLLMENT_CONFIG
+from encoding_store import EncodingStore, StoreUpdate, encode_image
+
+def _encode_chunk(filepaths: List[str]) -> List[Tuple[str, Optional[np.ndarray], Optional[str]]]:
+    """Кодирование пачки файлов в процессе пула"""
+    results: List[Tuple[str, Optional[np.ndarray], Optional[str]]] = []
+    for filepath in filepaths:
+        try:
+            results.append((filepath, encode_image(filepath), None))
+        except Exception as e:
+            results.append((filepath, None, f"{type(e).__name__}: {e}"))
+    return results
+
+def print_progress(done: int, total: int) -> None:
+    """Вывод прогресса кодирования в консоль"""
+    print(f"\r📷 Кодирование базы лиц: {done}/{total}", end='' if done < total else '\n', flush=True)
+
+class ParallelEncoder:
+    def __init__(self, workers: Optional[int] = None, chunksize: int = 8, progress_callback: Optional[Callable[[int, int], None]] = None) -> None:
+        self.workers: int = workers or os.cpu_count() or 1
+        self.chunksize: int = max(1, chunksize)
+        self.progress_callback: Optional[Callable[[int, int], None]] = progress_callback
+
+    def __call__(self, filepaths: List[str]) -> Tuple[Dict[str, Optional[np.ndarray]], Dict[str, str]]:
+        """Кодирование файлов пулом процессов: (кодировки, ошибки)"""
+        encodings: Dict[str, Optional[np.ndarray]] = {}
+        errors: Dict[str, str] = {}
+        total = len(filepaths)
+        if total == 0:
+            return encodings, errors
+        chunks = [filepaths[i:i + self.chunksize] for i in range(0, total, self.chunksize)]
+        workers = min(self.workers, len(chunks))
+        if workers > 1:
+            pool = multiprocessing.Pool(processes=workers)
+            results = pool.imap_unordered(_encode_chunk, chunks)
+        else:
+            pool = None
+            results = map(_encode_chunk, chunks)
+        try:
+            done = 0
+            for chunk_results in results:
+                for filepath, encoding, error in chunk_results:
+                    if error is not None:
+                        errors[filepath] = error
+                    else:
+                        encodings[filepath] = encoding
+                done += len(chunk_results)
+                if self.progress_callback is not None:
+                    self.progress_callback(done, total)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return encodings, errors
+
+def enroll_database(database_path: str = DATABASE_PATH, cache_path: str = ENCODING_CACHE_PATH, workers: Optional[int] = None,
+                    chunksize: Optional[int] = None, progress_callback: Optional[Callable[[int, int], None]] = print_progress) -> StoreUpdate:
+    """Инкрементальное построение кэша кодировок базы лиц на всех ядрах"""
+    encoder = ParallelEncoder(
+        workers if workers is not None else ENROLLMENT_CONFIG['workers'],
+        chunksize if chunksize is not None else ENROLLMENT_CONFIG['chunksize'],
+        progress_callback
+    )
+    return EncodingStore(database_path, cache_path).sync(encoder)
+
+if __name__ == "__main__":
+    import argparse
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Face database enrollment")
+    parser.add_argument('--database', default=DATABASE_PATH, help="folder with face images")
+    parser.add_argument('--cache', default=ENCODING_CACHE_PATH, help="encoding cache folder")
+    parser.add_argument('--workers', type=int, default=ENROLLMENT_CONFIG['workers'], help="number of processes (default: all cores)")
+    parser.add_argument('--chunksize', type=int, default=ENROLLMENT_CONFIG['chunksize'], help="files per task")
+    args = parser.parse_args()
+    start = time.time()
+    update = enroll_database(args.database, args.cache, args.workers, args.chunksize)
+    print(f"✅ Добавлено: {len(update.added)}, удалено: {len(update.removed)}, ошибок: {len(update.errors)} ({time.time() - start:.1f} с)")
+    for filename, error in update.errors.items():
+        print(f"❌ {filename}: {error}")
\ No newline at end of file
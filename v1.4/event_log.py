@@ -0,0 +1,194 @@
+# Только стандартная библиотека: модуль используется утилитой event_query без загрузки OpenCV и моделей.
+import bisect
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Optional, Any, List, Dict, Iterator, Tuple, Sequence
+
+INDEX_SUFFIX = ".idx"
+LATENESS_MARGIN = 5.0 # секунд сверх записанного в индексе опоздания при поиске конца интервала
+
+class IndexEntry:
+    __slots__ = ('offset', 'max_time', 'max_lateness')
+
+    def __init__(self, offset: int, max_time: float, max_lateness: float) -> None:
+        self.offset: int = offset # начало блока в журнале
+        self.max_time: float = max_time # наибольшее время всех событий до offset
+        self.max_lateness: float = max_lateness # наибольшее опоздание события относительно уже записанных
+
+def read_index(path: str) -> List[IndexEntry]:
+    """Разреженный индекс журнала (пустой, если индекса нет; поврежденные строки пропускаются)"""
+    entries: List[IndexEntry] = []
+    try:
+        with open(path + INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 3:
+                    continue
+                try:
+                    entries.append(IndexEntry(int(parts[0]), float(parts[1]), float(parts[2])))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+def event_time(line: bytes) -> Optional[float]:
+    """Время события без разбора всей строки ("t" всегда записывается первым полем)"""
+    if not line.startswith(b'{"t": '):
+        return None
+    end = line.find(b',', 6)
+    try:
+        return float(line[6:end if end > 0 else None])
+    except ValueError:
+        return None
+
+class ProcessEvents:
+    def __init__(self, event_queue: multiprocessing.Queue) -> None:
+        self.event_queue: multiprocessing.Queue = event_queue
+
+    def record(self, event_type: str, frame: int, **data: Any) -> None:
+        """Событие процесса-обработчика: передается в журнал основного процесса (время - момент вызова)"""
+        try:
+            self.event_queue.put_nowait(dict({'t': round(time.time(), 3), 'frame': frame, 'type': event_type}, **data))
+        except Exception:
+            pass
+
+class EventLog:
+    def __init__(self, path: str, index_bytes: int = 262144, flush_interval: float = 1.0) -> None:
+        self.path: str = path
+        self.index_bytes: int = index_bytes
+        self.flush_interval: float = flush_interval
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        self.file: Any = open(path, 'ab')
+        self.index_file: Any = open(path + INDEX_SUFFIX, 'a', encoding='utf-8')
+        self.offset: int = self.file.tell()
+        self.max_time, self.max_lateness, self.last_indexed = self._resume()
+        self.queue: multiprocessing.Queue = multiprocessing.Queue()
+        self.recorded: int = 0
+        self.errors: int = 0
+        self.closed: bool = False
+        self.thread: threading.Thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _resume(self) -> Tuple[float, float, int]:
+        """Состояние индекса для дозаписи: последняя запись индекса и события после нее"""
+        entries = read_index(self.path)
+        max_time, max_lateness, last_indexed = 0.0, 0.0, 0
+        if entries and entries[-1].offset <= self.offset:
+            max_time, max_lateness, last_indexed = entries[-1].max_time, entries[-1].max_lateness, entries[-1].offset
+        if self.offset > 0:
+            line = b'\n'
+            with open(self.path, 'rb') as f:
+                f.seek(last_indexed)
+                for line in f:
+                    timestamp = event_time(line)
+                    if timestamp is not None:
+                        max_lateness = max(max_lateness, max_time - timestamp)
+                        max_time = max(max_time, timestamp)
+            if not line.endswith(b'\n'):
+                self._append(b'\n')
+        return max_time, max_lateness, last_indexed
+
+    def _append(self, data: bytes) -> None:
+        self.file.write(data)
+        self.offset += len(data)
+
+    def record(self, event_type: str, frame: int, **data: Any) -> None:
+        """Событие основного процесса: время, номер кадра, тип и поля события (имя, сходство, рамка)"""
+        if self.closed:
+            return
+        self.queue.put(dict({'t': round(time.time(), 3), 'frame': frame, 'type': event_type}, **data))
+
+    def process_events(self) -> ProcessEvents:
+        """Обработчик журнала для процессов-обработчиков (события идут через ту же очередь)"""
+        return ProcessEvents(self.queue)
+
+    def _run(self) -> None:
+        last_flush = time.time()
+        while True:
+            try:
+                event = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                event = False
+            except (EOFError, OSError):
+                return
+            if event is None:
+                self._flush()
+                return
+            if event is not False:
+                self._write(event)
+            if time.time() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.time()
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        try:
+            if self.offset - self.last_indexed >= self.index_bytes:
+                self.index_file.write(f"{self.offset} {self.max_time:.3f} {self.max_lateness:.3f}\n")
+                self.last_indexed = self.offset
+            self._append((json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8'))
+            self.max_lateness = max(self.max_lateness, self.max_time - event['t'])
+            self.max_time = max(self.max_time, event['t'])
+            self.recorded += 1
+        except (OSError, TypeError, ValueError):
+            self.errors += 1
+
+    def _flush(self) -> None:
+        try:
+            self.file.flush()
+            self.index_file.flush()
+        except OSError:
+            pass
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Запись оставшихся событий и закрытие журнала"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join(timeout=timeout)
+        self.file.close()
+        self.index_file.close()
+
+def query_events(path: str, start: Optional[float] = None, end: Optional[float] = None, person: Optional[str] = None,
+                 types: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+    """События журнала в интервале [start, end] для лица person (имя файла с расширением или без) и типов types.
+    Начало интервала ищется по разреженному индексу, чтение прекращается после end с учетом опоздавших событий"""
+    entries = read_index(path)
+    offset = 0
+    if start is not None and entries:
+        position = bisect.bisect_left([entry.max_time for entry in entries], start)
+        if position > 0:
+            offset = entries[position - 1].offset
+    stop_after = None
+    if end is not None and entries:
+        stop_after = end + entries[-1].max_lateness + LATENESS_MARGIN
+    person_bytes = json.dumps(os.path.splitext(person)[0], ensure_ascii=False)[1:-1].encode('utf-8') if person else None
+    type_set = set(types) if types else None
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            timestamp = event_time(line)
+            if timestamp is None:
+                continue
+            if stop_after is not None and timestamp > stop_after:
+                break
+            if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                continue
+            if person_bytes is not None and person_bytes not in line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if type_set is not None and event.get('type') not in type_set:
+                continue
+            if person is not None and os.path.splitext(str(event.get('name')))[0] != os.path.splitext(person)[0]:
+                continue
+            yield event
@@ -0,0 +1,37 @@
+# Выборка событий из журнала обнаружений: python event_query.py database/events/events.jsonl --since "2024-05-01 12:00" --person Ivan
+import argparse
+import json
+import sys
+from datetime import datetime
+from typing import Optional
+
+from event_log import query_events
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Время как число секунд Unix или дата ISO (2024-05-01 12:00:00)"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the detection event log")
+    parser.add_argument('path', help="event log file (EVENT_LOG_CONFIG['path'], database/events/events.jsonl by default)")
+    parser.add_argument('--since', default=None, help="start time: Unix seconds or ISO date")
+    parser.add_argument('--until', default=None, help="end time: Unix seconds or ISO date")
+    parser.add_argument('--person', default=None, help="database image name, with or without extension")
+    parser.add_argument('--type', action='append', default=None, help="event type, may be repeated")
+    parser.add_argument('--limit', type=int, default=None, help="stop after this many events")
+    parser.add_argument('--count', action='store_true', help="print only the number of matching events")
+    args = parser.parse_args()
+    found = 0
+    for event in query_events(args.path, parse_time(args.since), parse_time(args.until), args.person, args.type):
+        found += 1
+        if not args.count:
+            sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+        if args.limit is not None and found >= args.limit:
+            break
+    if args.count:
+        print(found)
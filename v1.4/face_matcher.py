@@ -0,0 +1,100 @@
+from imports import *
+
+ENCODING_SIZE = 128
+
+class FaceMatch(NamedTuple):
+    name: str
+    distance: float
+    top_k: List[Tuple[str, float]]
+
+def squared_norms(vectors: np.ndarray) -> np.ndarray:
+    """Квадраты норм строк матрицы"""
+    return np.einsum('ij,ij->i', vectors, vectors)
+
+def pairwise_distances(queries: np.ndarray, encodings: np.ndarray, encodings_sq_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """Евклидовы расстояния (запросы x кодировки) через одно матричное умножение"""
+    if encodings_sq_norms is None:
+        encodings_sq_norms = squared_norms(encodings)
+    sq_dist = squared_norms(queries)[:, None] + encodings_sq_norms[None, :] - 2.0 * (queries @ encodings.T)
+    np.maximum(sq_dist, 0.0, out=sq_dist)
+    return np.sqrt(sq_dist, out=sq_dist)
+
+class FaceMatcher:
+    index_type: str = 'brute'
+
+    def __init__(self, encodings: Optional[np.ndarray] = None, names: Optional[Sequence[str]] = None) -> None:
+        self.encodings: np.ndarray = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self.names: np.ndarray = np.empty(0, dtype=object)
+        self.sq_norms: np.ndarray = np.empty(0, dtype=np.float32)
+        if encodings is not None:
+            self.set_database(encodings, names if names is not None else [])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def set_database(self, encodings: np.ndarray, names: Sequence[str]) -> None:
+        """Замена всей базы одной непрерывной матрицей (N, 128)"""
+        encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        if len(encodings) != len(names):
+            raise ValueError("Encodings and names have different lengths.")
+        self.encodings = encodings
+        self.names = np.array(names, dtype=object)
+        self.sq_norms = squared_norms(encodings)
+
+    def rebased(self, encodings: np.ndarray, names: Sequence[str]) -> "FaceMatcher":
+        """Копия на новой матрице базы (memory-map кэша используется без копирования и общий для всех процессов)"""
+        matcher = copy.copy(self)
+        FaceMatcher.set_database(matcher, encodings, names)
+        matcher._on_rebased()
+        return matcher
+
+    def _on_rebased(self) -> None:
+        pass
+
+    def _queries(self, face_encodings: Union[np.ndarray, Sequence[np.ndarray]]) -> np.ndarray:
+        return np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+
+    def distances(self, face_encodings: Union[np.ndarray, Sequence[np.ndarray]]) -> np.ndarray:
+        """Матрица расстояний (лица x записи базы) одним вызовом"""
+        queries = self._queries(face_encodings)
+        if len(self.names) == 0 or len(queries) == 0:
+            return np.empty((len(queries), len(self.names)), dtype=np.float32)
+        return pairwise_distances(queries, self.encodings, self.sq_norms)
+
+    def _make_match(self, row: np.ndarray, rows: Optional[np.ndarray], tolerance: float, top_k: int) -> FaceMatch:
+        """Выбор top-k из строки расстояний (rows - индексы записей базы для столбцов)"""
+        if len(row) == 0:
+            return FaceMatch("Unknown", 1.0, [])
+        k = max(1, min(top_k, len(row)))
+        candidates = np.argpartition(row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+        order = candidates[np.argsort(row[candidates], kind='stable')]
+        db_rows = order if rows is None else rows[order]
+        top = [(self.names[db_row], float(row[idx])) for idx, db_row in zip(order, db_rows)]
+        best_name, best_distance = top[0]
+        if best_distance < tolerance:
+            return FaceMatch(best_name, best_distance, top)
+        return FaceMatch("Unknown", 1.0, top)
+
+    def match(self, face_encodings: Union[np.ndarray, Sequence[np.ndarray]], tolerance: float, top_k: int = 1) -> List[FaceMatch]:
+        """Лучшее совпадение, расстояние и top-k для каждого лица"""
+        return [self._make_match(row, None, tolerance, top_k) for row in self.distances(face_encodings)]
+
+def index_type_for(config: Dict[str, Any], count: int) -> str:
+    """Тип индекса для базы из count записей: 'ivf' только начиная с ivf_min_size"""
+    if config.get('index', 'brute') == 'ivf' and count >= config.get('ivf_min_size', 0):
+        return 'ivf'
+    return 'brute'
+
+def create_face_matcher(config: Dict[str, Any], encodings: Optional[np.ndarray] = None, names: Optional[Sequence[str]] = None) -> FaceMatcher:
+    """Полный перебор или IVF-индекс в зависимости от настроек и размера базы"""
+    count = 0 if encodings is None else len(encodings)
+    if index_type_for(config, count) == 'ivf':
+        from ann_index import IVFFaceMatcher
+        return IVFFaceMatcher(encodings, names, n_lists=config.get('ivf_lists'), n_probe=config.get('ivf_probe', 8))
+    return FaceMatcher(encodings, names)
+
+def rebase_face_matcher(matcher: FaceMatcher, config: Dict[str, Any], encodings: np.ndarray, names: Sequence[str]) -> FaceMatcher:
+    """Сопоставитель для новой базы: копия текущего или новый (с обучением IVF), если база пересекла ivf_min_size"""
+    if index_type_for(config, len(encodings)) != matcher.index_type:
+        return create_face_matcher(config, encodings, names)
+    return matcher.rebased(encodings, names)
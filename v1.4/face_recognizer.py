@@ -1,63 +1,149 @@
 from imports import *
-from config import FACE_RECOGNITION_CONFIG, ASYNC_CONFIG, DATABASE_PATH, FACES_FOLDER
+from config import FACE_RECOGNITION_CONFIG, ASYNC_CONFIG, ENROLLMENT_CONFIG, IMAGE_WRITER_CONFIG, DATABASE_PATH, ENCODING_CACHE_PATH, FACES_FOLDER
+from face_matcher import create_face_matcher
+from encoding_store import EncodingStore, DatabaseWatcher
+from enrollment import enroll_database
+from frame_buffer import SharedFrameRing, FrameRef, resolve_frame
+from face_tracker import FaceTracker
+from hud_renderer import OverlayRenderer, blend_panel
+from image_writer import create_image_writer
+from logmaker import ProcessLog
+from event_log import ProcessEvents
+
+def detect_face_locations(rgb_frame: np.ndarray, model: str, regions: Optional[List[Tuple[int, int, int, int]]] = None,
+                          scale: float = 1.0) -> List[Tuple[int, int, int, int]]:
+    """Поиск лиц во всем кадре или только в заданных областях на уменьшенном изображении (координаты в системе кадра)"""
+    frame_height, frame_width = rgb_frame.shape[:2]
+    if not regions:
+        regions = [(0, frame_width, frame_height, 0)]
+    locations = []
+    for region_top, region_right, region_bottom, region_left in regions:
+        crop = rgb_frame[region_top:region_bottom, region_left:region_right]
+        if scale != 1.0:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        for top, right, bottom, left in face_recognition.face_locations(crop, model=model):
+            locations.append((
+                max(0, int(top / scale) + region_top),
+                min(frame_width, int(right / scale) + region_left),
+                min(frame_height, int(bottom / scale) + region_top),
+                max(0, int(left / scale) + region_left)
+            ))
+    return locations
+
+class FaceSaveRegistry:
+    def __init__(self, counts: Optional[Any] = None, state: Optional[Any] = None, lock: Optional[Any] = None) -> None:
+        self.counts: Any = counts if counts is not None else {}
+        self.state: Any = state if state is not None else {'last_saved_face': None, 'frame_count': -1}
+        self.lock: Any = lock if lock is not None else threading.Lock()
+
+    @classmethod
+    def shared(cls, manager: Any) -> "FaceSaveRegistry":
+        """Общий для всех обработчиков учет сохранений (словари и блокировка менеджера multiprocessing)"""
+        return cls(manager.dict(), manager.dict({'last_saved_face': None, 'frame_count': -1}), manager.Lock())
+
+    def register(self, found_faces: List[str], frame_count: int) -> Tuple[List[Tuple[str, int]], Optional[str], bool]:
+        """Лица кадра, которые нужно сохранить (имя, номер снимка), и последнее сохраненное лицо;
+        кадры старше уже учтенного (от более медленного обработчика) состояние не меняют"""
+        with self.lock:
+            if frame_count < self.state['frame_count']:
+                return [], self.state['last_saved_face'], False
+            last_saved_face = self.state['last_saved_face']
+            saves = []
+            for person_name in found_faces:
+                if last_saved_face != person_name:
+                    count = self.counts.get(person_name, 0) + 1
+                    self.counts[person_name] = count
+                    saves.append((person_name, count))
+            last_saved_face = found_faces[0] if found_faces else None
+            self.state.update({'last_saved_face': last_saved_face, 'frame_count': frame_count})
+            return saves, last_saved_face, True
+
+    def reset(self, frame_count: int) -> None:
+        """Сброс последнего сохраненного лица (человек ушел из кадра): при возвращении снимок сохраняется снова"""
+        with self.lock:
+            if frame_count >= self.state['frame_count']:
+                self.state.update({'last_saved_face': None, 'frame_count': frame_count})
 
 def face_worker(input_queue: multiprocessing.Queue, output_queue: multiprocessing.Queue, config: Dict[str, Any]) -> None:
-    """Процесс распознавания лиц"""
-    face_database: Dict[str, Any] = {}
+    """Процесс распознавания лиц; на каждую задачу - ответ (результат или None, если кадр не обработан)"""
+    frame_ring = SharedFrameRing.attach(config['frame_ring']) if config.get('frame_ring') else None
     database_path: str = config['database_path']
     faces_folder: str = config['faces_folder']
-    if os.path.exists(database_path):
-        for filename in os.listdir(database_path):
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                filepath = os.path.join(database_path, filename)
-                try:
-                    image = face_recognition.load_image_file(filepath)
-                    encodings = face_recognition.face_encodings(image)
-                    if encodings:
-                        face_database[filename] = encodings[0]
-                except:
-                    pass
+    store_owner: bool = config.get('store_owner', True)
+    save_registry: FaceSaveRegistry = config.get('save_registry') or FaceSaveRegistry()
+    log: Optional[ProcessLog] = config.get('log')
+    events: Optional[ProcessEvents] = config.get('events')
+    image_writer = create_image_writer(config['image_writer'], log.writelog if log is not None else None)
+    worker_stats = {'worker_id': config.get('worker_id', 0), 'errors': 0}
+    encoding_store = EncodingStore(database_path, config['cache_path'])
+    if config['sync_on_start'] and store_owner:
+        try:
+            update = encoding_store.sync()
+            for filename, error in update.errors.items():
+                print(f"❌ Ошибка кодирования {filename}: {error}")
+        except Exception as e:
+            print(f"❌ Ошибка обновления кэша кодировок: {e}")
+            if log is not None:
+                log.writelog(f'Face encoding cache sync error:\n{e}')
+    database_watcher = DatabaseWatcher(encoding_store, create_face_matcher(config, *encoding_store.load()), config['reload_interval'] or 0, store_owner, config)
+    if config['reload_interval']:
+        database_watcher.start()
+    face_tracker: Optional[FaceTracker] = FaceTracker(config['detect_interval']) if config['tracking'] else None
     face_search_active: bool = False
     face_found: bool = False
     last_saved_face: Optional[str] = None
     save_message_time: float = 0
-    face_save_count: Dict[str, int] = {}
     last_processed_frame: Optional[np.ndarray] = None
     last_result: Optional[Dict[str, Any]] = None
     last_frame_count: int = 0
-    while True:
+    last_full_scan: int = -config['full_scan_interval']
+    stopping = False
+    while not stopping:
+        frame_count = -1
         try:
             latest_task = None
             while True:
                 try:
                     task = input_queue.get_nowait()
                     if task is None:
-                        if latest_task is not None:
-                            input_queue.put(latest_task)
+                        stopping = True
                         break
                     latest_task = task
                 except:
                     break
+            if stopping:
+                break
             if latest_task is None:
                 time.sleep(0.001)
                 continue
-            frame, frame_count, human_detected, command = latest_task
+            frame, frame_count, human_detected, command, head_regions = latest_task
+            frame = resolve_frame(frame_ring, frame)
+            if frame is None:
+                output_queue.put((None, frame_count))
+                continue
             if command == 'reset':
+                if face_tracker is not None:
+                    face_tracker.reset()
                 face_search_active = False
                 face_found = False
                 last_saved_face = None
                 save_message_time = 0
+                save_registry.reset(frame_count)
             if not human_detected:
+                if face_tracker is not None:
+                    face_tracker.reset()
                 if face_found or face_search_active:
                     face_search_active = False
                     face_found = False
                     last_saved_face = None
                     save_message_time = 0
+                save_registry.reset(frame_count) # флаги выше локальны для обработчика, общий учет сбрасывается всегда
                 output_queue.put(({
                     'recognized_persons': [],
                     'face_search_active': False,
                     'face_found': False,
-                    'last_saved_face': None
+                    'last_saved_face': None,
+                    **worker_stats, 'image_writer': image_writer.get_stats()
                 }, frame_count))
                 continue
             if human_detected and not face_search_active and not face_found:
@@ -75,45 +161,50 @@ def face_worker(input_queue: multiprocessing.Queue, output_queue: multiprocessin
                 recognized_persons_data = []
                 if frame_count % processing_interval == 0:
                     try:
-                        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        model_type = config['model']
-                        face_locations = face_recognition.face_locations(rgb_frame, model=model_type)
-                        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+                        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if face_tracker is not None else None
+                        tracked_persons = None
+                        if face_tracker is not None and not face_tracker.needs_detection(frame_count, gray_frame):
+                            tracked_persons = face_tracker.propagate(gray_frame)
                         last_processed_frame = frame.copy()
                         last_frame_count = frame_count
-                        current_found_faces = []
-                        for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                            person_name = "Unknown"
-                            best_match_distance = 1.0
-                            for db_name, db_encoding in face_database.items():
-                                face_distance = face_recognition.face_distance([db_encoding], face_encoding)[0]
-                                if face_distance < config['tolerance'] and face_distance < best_match_distance:
-                                    best_match_distance = face_distance
-                                    person_name = db_name
-                            similarity_percent = (1 - best_match_distance) * 100 if person_name != "Unknown" else 0.0
-                            if person_name != "Unknown":
-                                current_found_faces.append(person_name)
-                                if person_name not in face_save_count:
-                                    face_save_count[person_name] = 0
-                                
-                                if last_saved_face != person_name: #face_save_count[person_name] >= 1:
-                                    face_save_count[person_name] += 1
-                                    base_name = os.path.splitext(person_name)[0]
-                                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                                    filename = f"{base_name}_{face_save_count[person_name]}_{timestamp}.jpg"
-                                    if not os.path.exists(faces_folder):
-                                        os.makedirs(faces_folder)
-                                    cv2.imwrite(os.path.join(faces_folder, filename), frame)
-                            recognized_persons_data.append((person_name, (top, right, bottom, left), similarity_percent))
-                        if not current_found_faces:
-                            last_saved_face = None
+                        if tracked_persons is not None:
+                            recognized_persons_data = tracked_persons
                         else:
-                            for person_name, location, similarity in recognized_persons_data:
-                                if person_name != "Unknown":
-                                    last_saved_face = person_name
-                                    save_message_time = time.time()
-                                    break
+                            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                            model_type = config['model']
+                            if head_regions and frame_count - last_full_scan < config['full_scan_interval']:
+                                face_locations = detect_face_locations(rgb_frame, model_type, head_regions, config['detection_scale'])
+                            else:
+                                face_locations = detect_face_locations(rgb_frame, model_type, scale=config['detection_scale'])
+                                last_full_scan = frame_count
+                            face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+                            face_matches = database_watcher.matcher.match(face_encodings, config['tolerance'])
+                            for (top, right, bottom, left), (person_name, best_match_distance, _) in zip(face_locations, face_matches):
+                                similarity_percent = (1 - best_match_distance) * 100 if person_name != "Unknown" else 0.0
+                                recognized_persons_data.append((person_name, (top, right, bottom, left), similarity_percent))
+                            # сохраняются только лица, подтвержденные сравнением на этом кадре; имена, удержанные трекером, - только для отображения
+                            current_found_faces = [person_name for person_name, _, _ in recognized_persons_data if person_name != "Unknown"]
+                            if face_tracker is not None:
+                                recognized_persons_data = face_tracker.update(gray_frame, frame_count, recognized_persons_data)
+                            saves, last_saved_face, is_latest = save_registry.register(current_found_faces, frame_count)
+                            for person_name, save_count in saves:
+                                base_name = os.path.splitext(person_name)[0]
+                                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                                image_name = f"{base_name}_{save_count}_{timestamp}"
+                                on_written = None
+                                if events is not None:
+                                    on_written = lambda filepath, name=person_name, saved_frame=frame_count: events.record('face_saved', saved_frame, name=name, file=os.path.basename(filepath))
+                                image_writer.submit(faces_folder, image_name, frame, on_written=on_written)
+                            if current_found_faces and is_latest:
+                                save_message_time = time.time()
+                        if events is not None and tracked_persons is None:
+                            for person_name, location, similarity_percent in recognized_persons_data:
+                                events.record('face_detected', frame_count, name=person_name, similarity=round(float(similarity_percent), 1),
+                                              bbox=[int(value) for value in location])
                     except Exception as e:
+                        worker_stats['errors'] += 1
+                        if log is not None:
+                            log.writelog(f"Face worker {worker_stats['worker_id']} recognition error on frame {frame_count}:\n{e}")
                         recognized_persons_data = []
                 final_persons = recognized_persons_data
                 last_result = {
@@ -123,43 +214,168 @@ def face_worker(input_queue: multiprocessing.Queue, output_queue: multiprocessin
                     'last_saved_face': last_saved_face,
                     'save_message_time': save_message_time
                 }
-            output_queue.put((last_result, frame_count))
+            output_queue.put((dict(last_result, **worker_stats, image_writer=image_writer.get_stats()), frame_count))
         except Exception as e:
+            worker_stats['errors'] += 1
+            if log is not None:
+                log.writelog(f"Face worker {worker_stats['worker_id']} error on frame {frame_count}:\n{e}")
+            if frame_count >= 0:
+                output_queue.put((None, frame_count))
             continue
+    database_watcher.stop()
+    image_writer.stop()
 
 class FaceRecognizer:
-    def __init__(self, file_manager: Any, log_maker: Any) -> None:
+    def __init__(self, file_manager: Any, log_maker: Any, frame_ring: Optional[SharedFrameRing] = None,
+                 overlay_renderer: Optional[OverlayRenderer] = None, events: Optional[ProcessEvents] = None) -> None:
+        self.events: Optional[ProcessEvents] = events
         self.file_manager: Any = file_manager
         self.log_maker: Any = log_maker
         self.logfile_name: str = self.file_manager.get_logfile_name()
+        self.frame_ring: Optional[SharedFrameRing] = frame_ring
+        self.overlay_renderer: OverlayRenderer = overlay_renderer or OverlayRenderer()
         self.face_search_active: bool = False
         self.face_found: bool = False
         self.last_saved_face: Optional[str] = None
         self.save_message_time: float = 0
         self.last_saved_face_similarity: float = 0
-        self.input_queue: multiprocessing.Queue = multiprocessing.Queue(maxsize=1)
-        self.output_queue: multiprocessing.Queue = multiprocessing.Queue(maxsize=1)
+        self.requested_workers: int = max(1, ASYNC_CONFIG.get('face_workers') or 1)
+        # трекеру нужны все кадры подряд: при сопровождении лиц работает один обработчик
+        self.workers: int = 1 if FACE_RECOGNITION_CONFIG.get('tracking', False) else self.requested_workers
+        self.input_queues: List[multiprocessing.Queue] = []
+        self.output_queue: multiprocessing.Queue = multiprocessing.Queue(maxsize=2 * self.workers)
+        self.processes: List[multiprocessing.Process] = []
         self.process: Optional[multiprocessing.Process] = None
+        self.manager: Optional[Any] = None
+        self.pending: Dict[int, Tuple[int, float]] = {} # номер кадра -> (обработчик, время отправки)
+        self.next_worker: int = 0
         self.latest_result: List[Tuple[str, Tuple[int, int, int, int], float]] = []
+        self.last_result_frame: int = -1
+        self.stats: Dict[str, int] = {'submitted': 0, 'completed': 0, 'busy': 0, 'stale': 0, 'skipped': 0, 'timeouts': 0}
+        self.writer_stats: Dict[int, Dict[str, int]] = {} # обработчик -> последние счетчики его записи снимков
+        self.worker_errors: Dict[int, int] = {} # обработчик -> число ошибок обработки кадров
         if ASYNC_CONFIG['face_processing']:
             self.start_process()
             
+    def enroll(self) -> None:
+        """Параллельное кодирование новых и измененных изображений базы лиц"""
+        try:
+            update = enroll_database(DATABASE_PATH, ENCODING_CACHE_PATH)
+            self.log_maker.writelog(self.logfile_name, f'Face database enrolled: {len(update.added)} added, {len(update.removed)} removed, {len(update.errors)} errors.')
+            for filename, error in update.errors.items():
+                self.log_maker.writelog(self.logfile_name, f'Face enrollment error {filename}:\n{error}')
+        except Exception as e:
+            self.log_maker.writelog(self.logfile_name, f'Face enrollment error:\n{e}')
+
     def start_process(self) -> None:
+        if ENROLLMENT_CONFIG['enroll_on_start']:
+            self.enroll()
         config = {
             'database_path': DATABASE_PATH,
+            'cache_path': ENCODING_CACHE_PATH,
+            'sync_on_start': not ENROLLMENT_CONFIG['enroll_on_start'],
             'faces_folder': FACES_FOLDER,
             'model': FACE_RECOGNITION_CONFIG.get('model', 'hog'),
-            'tolerance': FACE_RECOGNITION_CONFIG['tolerance']
+            'tolerance': FACE_RECOGNITION_CONFIG['tolerance'],
+            'index': FACE_RECOGNITION_CONFIG.get('index', 'brute'),
+            'ivf_min_size': FACE_RECOGNITION_CONFIG.get('ivf_min_size', 0),
+            'ivf_lists': FACE_RECOGNITION_CONFIG.get('ivf_lists'),
+            'ivf_probe': FACE_RECOGNITION_CONFIG.get('ivf_probe', 8),
+            'reload_interval': FACE_RECOGNITION_CONFIG.get('reload_interval'),
+            'tracking': FACE_RECOGNITION_CONFIG.get('tracking', False),
+            'detect_interval': FACE_RECOGNITION_CONFIG.get('detect_interval', 10),
+            'full_scan_interval': FACE_RECOGNITION_CONFIG.get('full_scan_interval', 1),
+            'detection_scale': FACE_RECOGNITION_CONFIG.get('detection_scale', 1.0),
+            'frame_ring': self.frame_ring.descriptor() if self.frame_ring else None,
+            'save_registry': None,
+            'image_writer': IMAGE_WRITER_CONFIG,
+            'log': self.log_maker.process_log(),
+            'events': self.events
         }
-        self.process = multiprocessing.Process(
-            target=face_worker,
-            args=(self.input_queue, self.output_queue, config),
-            daemon=True
-        )
-        self.process.start()
+        if self.workers > 1:
+            self.manager = multiprocessing.Manager()
+            config['save_registry'] = FaceSaveRegistry.shared(self.manager)
+        for worker_id in range(self.workers):
+            input_queue = multiprocessing.Queue(maxsize=1)
+            process = multiprocessing.Process(
+                target=face_worker,
+                args=(input_queue, self.output_queue, dict(config, store_owner=worker_id == 0, worker_id=worker_id)),
+                daemon=True
+            )
+            process.start()
+            self.input_queues.append(input_queue)
+            self.processes.append(process)
+        self.process = self.processes[0]
+        if self.workers > 1:
+            self.log_maker.writelog(self.logfile_name, f'Face recognition started in {self.workers} worker processes.')
+        elif self.requested_workers > 1:
+            self.log_maker.writelog(self.logfile_name, f'Face tracking is on: face recognition uses 1 worker process instead of {self.requested_workers}.')
+
+    def _free_worker(self) -> Optional[int]:
+        """Следующий по кругу обработчик без кадра в работе (зависшие дольше processing_timeout освобождаются)"""
+        now = time.time()
+        for frame_count, (worker_id, sent_time) in list(self.pending.items()):
+            if now - sent_time > ASYNC_CONFIG['processing_timeout']:
+                del self.pending[frame_count]
+                self.stats['timeouts'] += 1
+        busy = {worker_id for worker_id, _ in self.pending.values()}
+        for offset in range(self.workers):
+            worker_id = (self.next_worker + offset) % self.workers
+            if worker_id not in busy:
+                self.next_worker = (worker_id + 1) % self.workers
+                return worker_id
+        return None
+
+    def _submit(self, raw_frame: np.ndarray, frame_count: int, is_human_detected: bool, frame_ref: Optional[FrameRef],
+                head_regions: Optional[List[Tuple[int, int, int, int]]]) -> None:
+        worker_id = self._free_worker()
+        if worker_id is None:
+            self.stats['busy'] += 1
+            return
+        try:
+            command = None
+            payload = frame_ref if frame_ref is not None else raw_frame.copy()
+            self.input_queues[worker_id].put_nowait((payload, frame_count, is_human_detected, command, head_regions))
+            self.pending[frame_count] = (worker_id, time.time())
+            self.stats['submitted'] += 1
+        except queue.Full:
+            self.stats['busy'] += 1
 
-    def process_faces(self, raw_frame: np.ndarray, frame_count: int, is_human_detected: bool) -> List[Tuple[str, Tuple[int, int, int, int], float]]:
-        """Обработка лиц - оптимизированная для отслеживания"""
+    def _collect(self) -> None:
+        """Прием результатов: применяется результат самого нового кадра, опоздавшие результаты старых кадров отбрасываются"""
+        try:
+            latest_data = None
+            while not self.output_queue.empty():
+                data, count = self.output_queue.get_nowait()
+                self.pending.pop(count, None)
+                if data is not None and 'image_writer' in data:
+                    self.writer_stats[data['worker_id']] = data['image_writer']
+                    self.worker_errors[data['worker_id']] = data.get('errors', 0)
+                if data is None:
+                    self.stats['skipped'] += 1
+                elif count <= self.last_result_frame:
+                    self.stats['stale'] += 1
+                else:
+                    self.stats['completed'] += 1
+                    latest_data = data
+                    self.last_result_frame = count
+            if latest_data:
+                self.latest_result = latest_data['recognized_persons']
+                self.face_search_active = latest_data['face_search_active']
+                self.face_found = latest_data['face_found']
+                self.last_saved_face = latest_data['last_saved_face']
+                self.save_message_time = latest_data.get('save_message_time', 0)
+                if self.latest_result and len(self.latest_result) > 0:
+                    for person_name, location, similarity in self.latest_result:
+                        if person_name != "Unknown":
+                            self.last_saved_face_similarity = similarity
+                            break
+        except queue.Empty:
+            pass
+
+    def process_faces(self, raw_frame: np.ndarray, frame_count: int, is_human_detected: bool, frame_ref: Optional[FrameRef] = None,
+                      head_regions: Optional[List[Tuple[int, int, int, int]]] = None) -> List[Tuple[str, Tuple[int, int, int, int], float]]:
+        """Обработка лиц - оптимизированная для отслеживания (frame_ref - кадр уже записан в разделяемую память, head_regions - области голов по позе)"""
         if self.process:
             should_process = (
                 is_human_detected or 
@@ -167,38 +383,9 @@ class FaceRecognizer:
                 self.face_found or
                 frame_count % 1 == 0
             )
+            self._collect()
             if should_process:
-                try:
-                    command = None
-                    self.input_queue.put_nowait((raw_frame.copy(), frame_count, is_human_detected, command))
-                except queue.Full:
-                    try:
-                        while self.input_queue.qsize() > 5:
-                            self.input_queue.get_nowait()
-                        self.input_queue.put_nowait((raw_frame.copy(), frame_count, is_human_detected, command))
-                    except:
-                        pass
-            try:
-                latest_data = None
-                latest_frame_count = 0
-                while not self.output_queue.empty():
-                    data, count = self.output_queue.get_nowait()
-                    if count >= latest_frame_count:
-                        latest_data = data
-                        latest_frame_count = count
-                if latest_data:
-                    self.latest_result = latest_data['recognized_persons']
-                    self.face_search_active = latest_data['face_search_active']
-                    self.face_found = latest_data['face_found']
-                    self.last_saved_face = latest_data['last_saved_face']
-                    self.save_message_time = latest_data.get('save_message_time', 0)
-                    if self.latest_result and len(self.latest_result) > 0:
-                        for person_name, location, similarity in self.latest_result:
-                            if person_name != "Unknown":
-                                self.last_saved_face_similarity = similarity
-                                break
-            except queue.Empty:
-                pass
+                self._submit(raw_frame, frame_count, is_human_detected, frame_ref, head_regions)
         return self.latest_result
 
     def draw_faces_and_message(self, frame: np.ndarray, recognized_persons: List[Tuple[str, Tuple[int, int, int, int], float]]) -> np.ndarray:
@@ -239,81 +426,48 @@ class FaceRecognizer:
             cv2.line(frame, line[0], line[1], color, thickness)
 
     def _draw_multiple_faces_message_pil(self, frame: np.ndarray, known_faces: List[Tuple[str, Tuple[int, int, int, int], float]]) -> np.ndarray:
-        """Отрисовка информации о нескольких распознанных лицах через PIL"""
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(frame_rgb)
-        draw = ImageDraw.Draw(pil_img, 'RGBA')
-        try:
-            font = ImageFont.truetype("verdanab.ttf", 14)
-        except:
-            font = ImageFont.load_default()
-        main_text = f"РАСПОЗНАНО ЛИЦ: {len(known_faces)}"
-        try:
-            main_bbox = draw.textbbox((0, 0), main_text, font=font)
-            main_width = main_bbox[2] - main_bbox[0]
-            main_height = main_bbox[3] - main_bbox[1]
-            max_name_width = 0
-            total_height = main_height
-            for i, (person_name, location, similarity) in enumerate(known_faces):
-                if not isinstance(person_name, str):
-                    person_name = str(person_name)
-                display_name = os.path.splitext(person_name)[0]
-                face_text = f"{i+1}. {display_name} ({similarity:.1f}%)"
-                face_bbox = draw.textbbox((0, 0), face_text, font=font)
-                face_width = face_bbox[2] - face_bbox[0]
-                face_height = face_bbox[3] - face_bbox[1]
-                max_name_width = max(max_name_width, face_width)
-                total_height += face_height + 5
-            max_width = max(main_width, max_name_width)
-            text_height = total_height
-        except:
-            max_width = 350
-            text_height = 90
-        frame_height, frame_width = frame.shape[:2]
-        padding = 10
-        rect_x1 = 0
-        rect_y1 = frame_height - 5 - text_height - 10
-        rect_x2 = rect_x1 + max_width + 15
-        rect_y2 = frame_height
+        """Отрисовка информации о нескольких распознанных лицах - панель кэшируется, пока не изменятся имена и сходство"""
+        lines = [(f"РАСПОЗНАНО ЛИЦ: {len(known_faces)}", (224, 255, 255))]
+        for i, (person_name, location, similarity) in enumerate(known_faces):
+            display_name = os.path.splitext(str(person_name))[0]
+            lines.append((f"{i+1}. {display_name} ({similarity:.1f}%)", (127, 255, 0)))
+        panel = self.overlay_renderer.render_panel(lines, corner='top')
+        panel_height = panel[0].shape[0] - 1
+        frame_height = frame.shape[0]
+        rect_y1 = frame_height - panel_height
         if rect_y1 < 0:
             rect_y1 = 10
-            rect_y2 = rect_y1 + text_height + 2 * padding
-        radius = 25
-        points = [(rect_x1, rect_y1), (rect_x2 - radius, rect_y1)]
-        center_x, center_y = rect_x2 - radius, rect_y1 + radius
-        for angle in range(270, 361, 10):
-            rad = np.radians(angle)
-            px = center_x + radius * np.cos(rad)
-            py = center_y + radius * np.sin(rad)
-            points.append((px, py))
-        points.append((rect_x2, rect_y1 + radius))
-        points.append((rect_x2, rect_y2))
-        points.append((rect_x1, rect_y2))
-        points.append((rect_x1, rect_y1))
-        draw.polygon(points, fill=(128, 128, 128, 128))
-        text_x = rect_x1 + 5
-        text_y = rect_y1 + 5
-        draw.text((text_x, text_y), main_text, font=font, fill=(224, 255, 255, 255))
-        text_y += main_height + 5
-        for i, (person_name, location, similarity) in enumerate(known_faces):
-            if not isinstance(person_name, str):
-                person_name = str(person_name)
-            display_name = os.path.splitext(person_name)[0]
-            face_text = f"{i+1}. {display_name} ({similarity:.1f}%)"
-            draw.text((text_x, text_y), face_text, font=font, fill=(127, 255, 0, 255))
-            try:
-                face_bbox = draw.textbbox((0, 0), face_text, font=font)
-                face_height = face_bbox[3] - face_bbox[1]
-                text_y += face_height + 5
-            except:
-                text_y += 30
-        result = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-        return result
+        return blend_panel(frame, panel, 0, rect_y1)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Счетчики пула: отправлено, применено, пропущено из-за занятости, устаревшие и необработанные результаты"""
+        return dict(self.stats, workers=self.workers, errors=sum(self.worker_errors.values()))
+
+    def get_writer_stats(self) -> Dict[str, int]:
+        """Сумма последних полученных счетчиков записи снимков всех обработчиков"""
+        totals: Dict[str, int] = {}
+        for stats in self.writer_stats.values():
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
 
     def cleanup(self) -> None:
         """Очистка ресурсов"""
         if self.process:
-            self.input_queue.put(None)
-            self.process.join(timeout=1.0)
-            if self.process.is_alive():
-                self.process.terminate()
\ No newline at end of file
+            stats = self.get_stats()
+            self.log_maker.writelog(self.logfile_name, f"Face workers: {stats['workers']}, frames submitted: {stats['submitted']}, results applied: {stats['completed']}, late results dropped: {stats['stale']}, frames dropped while busy: {stats['busy']}, processing errors: {stats['errors']}.")
+            for input_queue in self.input_queues:
+                try:
+                    input_queue.put(None, timeout=0.5)
+                except queue.Full:
+                    pass
+            for process in self.processes:
+                process.join(timeout=3.0)
+                if process.is_alive():
+                    process.terminate()
+            writer_stats = self.get_writer_stats()
+            if writer_stats:
+                self.log_maker.writelog(self.logfile_name, f"Face photos: {writer_stats['queued']} queued, {writer_stats['written']} written, {writer_stats['dropped']} dropped, {writer_stats['errors']} write errors.")
+        if self.manager is not None:
+            self.manager.shutdown()
+            self.manager = None
\ No newline at end of file
@@ -0,0 +1,121 @@
+from imports import *
+
+Location = Tuple[int, int, int, int] # top, right, bottom, left
+
+def box_iou(a: Location, b: Location) -> float:
+    """IoU двух прямоугольников (top, right, bottom, left)"""
+    top, right, bottom, left = max(a[0], b[0]), min(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+class FaceTrack:
+    def __init__(self, track_id: int, name: str, location: Location, similarity: float) -> None:
+        self.track_id: int = track_id
+        self.name: str = name
+        self.similarity: float = similarity
+        self.box: np.ndarray = np.array(location, dtype=np.float32)
+        self.points: np.ndarray = np.empty((0, 1, 2), dtype=np.float32)
+        self.unknown_streak: int = 0
+
+    @property
+    def location(self) -> Location:
+        top, right, bottom, left = (int(round(value)) for value in self.box)
+        return top, right, bottom, left
+
+class FaceTracker:
+    def __init__(self, detect_interval: int = 10, iou_threshold: float = 0.3, identity_hold: int = 2, min_points: int = 4, max_points: int = 30) -> None:
+        self.detect_interval: int = detect_interval
+        self.iou_threshold: float = iou_threshold
+        self.identity_hold: int = identity_hold
+        self.min_points: int = min_points
+        self.max_points: int = max_points
+        self.tracks: List[FaceTrack] = []
+        self.prev_gray: Optional[np.ndarray] = None
+        self.last_detection_frame: int = -1
+        self.next_track_id: int = 0
+
+    def reset(self) -> None:
+        self.tracks = []
+        self.prev_gray = None
+        self.last_detection_frame = -1
+
+    def needs_detection(self, frame_count: int, gray: np.ndarray) -> bool:
+        """Полное распознавание нужно периодически, при отсутствии треков или смене размера кадра"""
+        return (not self.tracks or self.prev_gray is None or self.prev_gray.shape != gray.shape or
+                frame_count - self.last_detection_frame >= self.detect_interval)
+
+    def _seed_points(self, gray: np.ndarray, track: FaceTrack) -> None:
+        """Поиск углов для оптического потока внутри рамки лица"""
+        frame_height, frame_width = gray.shape[:2]
+        top, right, bottom, left = track.location
+        top, left = max(0, top), max(0, left)
+        bottom, right = min(frame_height, bottom), min(frame_width, right)
+        track.points = np.empty((0, 1, 2), dtype=np.float32)
+        if bottom - top < 8 or right - left < 8:
+            return
+        points = cv2.goodFeaturesToTrack(gray[top:bottom, left:right], maxCorners=self.max_points, qualityLevel=0.01, minDistance=3)
+        if points is not None:
+            track.points = (points + np.array([left, top], dtype=np.float32)).astype(np.float32)
+
+    def update(self, gray: np.ndarray, frame_count: int, detections: List[Tuple[str, Location, float]]) -> List[Tuple[str, Location, float]]:
+        """Сопоставление результатов полного распознавания с треками по IoU"""
+        unmatched = list(self.tracks)
+        tracks: List[FaceTrack] = []
+        persons: List[Tuple[str, Location, float]] = []
+        for name, location, similarity in detections:
+            best_track, best_iou = None, self.iou_threshold
+            for track in unmatched:
+                iou = box_iou(track.location, location)
+                if iou >= best_iou:
+                    best_track, best_iou = track, iou
+            if best_track is None:
+                track = FaceTrack(self.next_track_id, name, location, similarity)
+                self.next_track_id += 1
+            else:
+                track = best_track
+                unmatched.remove(track)
+                track.box = np.array(location, dtype=np.float32)
+                if name == "Unknown" and track.name != "Unknown" and track.unknown_streak < self.identity_hold:
+                    track.unknown_streak += 1
+                else:
+                    track.name, track.similarity, track.unknown_streak = name, similarity, 0
+            self._seed_points(gray, track)
+            tracks.append(track)
+            persons.append((track.name, location, track.similarity))
+        self.tracks = tracks
+        self.prev_gray = gray
+        self.last_detection_frame = frame_count
+        return persons
+
+    def propagate(self, gray: np.ndarray) -> Optional[List[Tuple[str, Location, float]]]:
+        """Перенос рамок оптическим потоком (None если хотя бы один трек потерян)"""
+        frame_height, frame_width = gray.shape[:2]
+        for track in self.tracks:
+            if len(track.points) < self.min_points:
+                return None
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, track.points, None, winSize=(15, 15), maxLevel=2)
+            if new_points is None:
+                return None
+            good = status.ravel() == 1
+            if good.sum() < self.min_points:
+                return None
+            old = track.points[good].reshape(-1, 2)
+            new = new_points[good].reshape(-1, 2)
+            shift = np.median(new - old, axis=0)
+            old_spread = np.median(np.linalg.norm(old - old.mean(axis=0), axis=1))
+            new_spread = np.median(np.linalg.norm(new - new.mean(axis=0), axis=1))
+            scale = float(np.clip(new_spread / old_spread, 0.8, 1.25)) if old_spread > 1e-3 else 1.0
+            top, right, bottom, left = track.box
+            center_x, center_y = (left + right) / 2 + shift[0], (top + bottom) / 2 + shift[1]
+            half_width, half_height = (right - left) * scale / 2, (bottom - top) * scale / 2
+            track.box = np.array([center_y - half_height, center_x + half_width, center_y + half_height, center_x - half_width], dtype=np.float32)
+            if track.box[3] < 0 or track.box[0] < 0 or track.box[1] > frame_width or track.box[2] > frame_height:
+                return None
+            track.points = new[:, None, :].astype(np.float32)
+            if len(track.points) < self.max_points // 2:
+                self._seed_points(gray, track)
+        self.prev_gray = gray
+        return [(track.name, track.location, track.similarity) for track in self.tracks]
\ No newline at end of file
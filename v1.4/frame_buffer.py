@@ -0,0 +1,85 @@
+from imports import *
+
+HEADER_FIELDS = 4 # frame_id, height, width, channels
+WRITING = -1
+
+class FrameRef(NamedTuple):
+    slot: int
+    frame_id: int
+
+class SharedFrameRing:
+    def __init__(self, slots: int, max_shape: Tuple[int, int, int], name: Optional[str] = None) -> None:
+        self.slots: int = slots
+        self.max_shape: Tuple[int, int, int] = tuple(max_shape)
+        self.slot_size: int = int(np.prod(self.max_shape))
+        header_size = slots * HEADER_FIELDS * np.dtype(np.int64).itemsize
+        self.owner: bool = name is None
+        if self.owner:
+            self.shm: shared_memory.SharedMemory = shared_memory.SharedMemory(create=True, size=header_size + slots * self.slot_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.header: np.ndarray = np.ndarray((slots, HEADER_FIELDS), dtype=np.int64, buffer=self.shm.buf)
+        self.data: np.ndarray = np.ndarray((slots, self.slot_size), dtype=np.uint8, buffer=self.shm.buf, offset=header_size)
+        self.next_slot: int = 0
+        if self.owner:
+            self.header[:] = WRITING
+
+    @classmethod
+    def attach(cls, descriptor: Dict[str, Any]) -> "SharedFrameRing":
+        """Подключение к кольцу из процесса-обработчика"""
+        return cls(descriptor['slots'], descriptor['max_shape'], descriptor['name'])
+
+    def descriptor(self) -> Dict[str, Any]:
+        """Параметры для подключения из другого процесса (передаются вместо кадров)"""
+        return {'name': self.shm.name, 'slots': self.slots, 'max_shape': self.max_shape}
+
+    def write(self, frame: np.ndarray, frame_id: int) -> Optional[FrameRef]:
+        """Однократная запись кадра в следующий слот (None если кадр не помещается)"""
+        if frame.dtype != np.uint8 or frame.size > self.slot_size:
+            return None
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % self.slots
+        header = self.header[slot]
+        header[0] = WRITING
+        shape = frame.shape if frame.ndim == 3 else (*frame.shape, 1)
+        self.data[slot, :frame.size].reshape(shape)[...] = frame.reshape(shape)
+        header[1:] = shape
+        header[0] = frame_id
+        return FrameRef(slot, frame_id)
+
+    def view(self, ref: FrameRef) -> Optional[np.ndarray]:
+        """Кадр без копирования (None если слот уже перезаписан)"""
+        header = self.header[ref.slot]
+        if header[0] != ref.frame_id:
+            return None
+        height, width, channels = (int(value) for value in header[1:])
+        frame = self.data[ref.slot, :height * width * channels].reshape(height, width, channels)
+        return frame if channels > 1 else frame[:, :, 0]
+
+    def is_current(self, ref: FrameRef) -> bool:
+        """Проверка, что слот не был перезаписан во время чтения"""
+        return self.header[ref.slot][0] == ref.frame_id
+
+    def read(self, ref: FrameRef) -> Optional[np.ndarray]:
+        """Копия кадра из слота (None если слот перезаписан до или во время копирования)"""
+        frame = self.view(ref)
+        if frame is None:
+            return None
+        frame = frame.copy()
+        return frame if self.is_current(ref) else None
+
+    def close(self) -> None:
+        """Отключение от разделяемой памяти (владелец также удаляет сегмент)"""
+        del self.header, self.data
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+def resolve_frame(frame_ring: Optional[SharedFrameRing], payload: Union[np.ndarray, FrameRef]) -> Optional[np.ndarray]:
+    """Кадр из задачи обработчика: копия из слота кольца или сам переданный массив"""
+    if isinstance(payload, FrameRef):
+        return frame_ring.read(payload) if frame_ring is not None else None
+    return payload
\ No newline at end of file
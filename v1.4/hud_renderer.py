@@ -0,0 +1,108 @@
+from imports import *
+from collections import OrderedDict
+
+TextLine = Tuple[str, Tuple[int, int, int]] # текст и цвет RGB
+Panel = Tuple[np.ndarray, np.ndarray] # BGR с предумножением на альфу (float32) и альфа (float32, H x W x 1)
+
+def load_font(font_path: str, font_size: int) -> Any:
+    """Шрифт TrueType или встроенный шрифт PIL, если файл не найден"""
+    try:
+        return ImageFont.truetype(font_path, font_size)
+    except (OSError, IOError):
+        return ImageFont.load_default()
+
+def blend_panel(frame: np.ndarray, panel: Panel, x: int, y: int) -> np.ndarray:
+    """Наложение панели на BGR-кадр на месте - смешивается только область панели"""
+    premultiplied, alpha = panel
+    frame_height, frame_width = frame.shape[:2]
+    x1, y1 = max(0, x), max(0, y)
+    x2, y2 = min(frame_width, x + premultiplied.shape[1]), min(frame_height, y + premultiplied.shape[0])
+    if x2 <= x1 or y2 <= y1:
+        return frame
+    panel_slice = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+    roi = frame[y1:y2, x1:x2]
+    roi[:] = (premultiplied[panel_slice] + roi * (1.0 - alpha[panel_slice]) + 0.5).astype(np.uint8)
+    return frame
+
+class OverlayRenderer:
+    def __init__(self, font_path: str = "verdanab.ttf", font_size: int = 14, cache_size: int = 256) -> None:
+        self.font: Any = load_font(font_path, font_size)
+        self.font_key: Tuple[str, int] = (font_path, font_size)
+        self.cache_size: int = cache_size
+        self.sprites: "OrderedDict[Tuple[Any, ...], Tuple[np.ndarray, np.ndarray, Tuple[int, int]]]" = OrderedDict()
+        self.panels: "OrderedDict[Tuple[Any, ...], Panel]" = OrderedDict()
+        self.masks: Dict[Tuple[int, int, int, str], np.ndarray] = {}
+
+    def _cached(self, cache: OrderedDict, key: Tuple[Any, ...], build: Callable[[], Any]) -> Any:
+        """LRU-кэш: FPS и проценты сходства меняются, поэтому старые элементы вытесняются"""
+        value = cache.get(key)
+        if value is None:
+            value = build()
+            cache[key] = value
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return value
+
+    def text_sprite(self, text: str, color: Tuple[int, int, int]) -> Tuple[np.ndarray, np.ndarray, Tuple[int, int]]:
+        """Спрайт текста: покрытие (H x W x 1), цвет BGR и размер строки для раскладки"""
+        return self._cached(self.sprites, (text, color, self.font_key), lambda: self._render_text(text, color))
+
+    def _render_text(self, text: str, color: Tuple[int, int, int]) -> Tuple[np.ndarray, np.ndarray, Tuple[int, int]]:
+        left, top, right, bottom = self.font.getbbox(text)
+        mask = Image.new('L', (max(1, right), max(1, bottom)), 0)
+        ImageDraw.Draw(mask).text((0, 0), text, font=self.font, fill=255)
+        coverage = np.asarray(mask, dtype=np.float32)[:, :, None] / 255.0
+        bgr = np.array(color[::-1], dtype=np.float32)
+        return coverage, bgr, (right - left, bottom - top)
+
+    def _background_mask(self, width: int, height: int, radius: int, corner: str) -> np.ndarray:
+        """Фон панели со скругленным правым углом ('bottom' или 'top')"""
+        key = (width, height, radius, corner)
+        mask = self.masks.get(key)
+        if mask is None:
+            x2, y2 = width, height
+            if corner == 'bottom':
+                points = [(0, 0), (x2, 0), (x2, y2 - radius)]
+                center_x, center_y, angles = x2 - radius, y2 - radius, range(0, 91, 10)
+            else:
+                points = [(0, 0), (x2 - radius, 0)]
+                center_x, center_y, angles = x2 - radius, radius, range(270, 361, 10)
+            for angle in angles:
+                rad = np.radians(angle)
+                points.append((center_x + radius * np.cos(rad), center_y + radius * np.sin(rad)))
+            points += [(x2, y2), (0, y2)] if corner == 'top' else [(0, y2)]
+            image = Image.new('L', (width + 1, height + 1), 0)
+            ImageDraw.Draw(image).polygon(points, fill=255)
+            mask = np.asarray(image, dtype=np.float32)[:, :, None] / 255.0
+            self.masks[key] = mask
+        return mask
+
+    def render_panel(self, lines: Sequence[TextLine], corner: str = 'bottom', radius: int = 25,
+                     background: Tuple[int, int, int, int] = (128, 128, 128, 128)) -> Panel:
+        """Полупрозрачная панель со строками текста (кэшируется по содержимому)"""
+        key = (tuple(lines), corner, radius, background, self.font_key)
+        return self._cached(self.panels, key, lambda: self._compose_panel(lines, corner, radius, background))
+
+    def _compose_panel(self, lines: Sequence[TextLine], corner: str, radius: int, background: Tuple[int, int, int, int]) -> Panel:
+        sprites = [self.text_sprite(text, color) for text, color in lines]
+        width = 5 + max(size[0] for _, _, size in sprites) + 10
+        height = 5 + sum(size[1] for _, _, size in sprites) + 5 * (len(sprites) - 1) + 10
+        background_alpha = self._background_mask(width, height, radius, corner) * (background[3] / 255.0)
+        alpha = background_alpha.copy()
+        premultiplied = background_alpha * np.array(background[2::-1], dtype=np.float32)
+        text_y = 5
+        for coverage, bgr, size in sprites:
+            sprite_height = min(coverage.shape[0], alpha.shape[0] - text_y)
+            sprite_width = min(coverage.shape[1], alpha.shape[1] - 5)
+            area = (slice(text_y, text_y + sprite_height), slice(5, 5 + sprite_width))
+            cover = coverage[:sprite_height, :sprite_width]
+            premultiplied[area] = bgr * cover + premultiplied[area] * (1.0 - cover)
+            alpha[area] = cover + alpha[area] * (1.0 - cover)
+            text_y += size[1] + 5
+        return premultiplied, alpha
+
+    def draw_panel(self, frame: np.ndarray, lines: Sequence[TextLine], x: int, y: int, corner: str = 'bottom') -> np.ndarray:
+        """Отрисовка панели в точке (x, y) BGR-кадра"""
+        return blend_panel(frame, self.render_panel(lines, corner), x, y)
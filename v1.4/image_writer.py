@@ -0,0 +1,116 @@
+from imports import *
+
+ENCODE_PARAMS: Dict[str, List[int]] = {
+    'jpg': [cv2.IMWRITE_JPEG_QUALITY],
+    'webp': [cv2.IMWRITE_WEBP_QUALITY],
+    'png': [cv2.IMWRITE_PNG_COMPRESSION]
+}
+DROP_POLICIES = ('drop_new', 'drop_oldest', 'block')
+
+class ImageWriter:
+    def __init__(self, image_format: str = 'jpg', quality: Optional[int] = 90, queue_size: int = 8, drop_policy: str = 'drop_oldest',
+                 block_timeout: float = 0.1, threads: int = 1, log: Optional[Callable[[str], None]] = None) -> None:
+        if image_format not in ENCODE_PARAMS:
+            raise ValueError(f"Unknown image format: {image_format}")
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.image_format: str = image_format
+        self.encode_params: List[int] = ENCODE_PARAMS[image_format] + [int(quality)] if quality is not None else []
+        self.drop_policy: str = drop_policy
+        self.block_timeout: float = block_timeout
+        self.log: Optional[Callable[[str], None]] = log
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.stats_lock: threading.Lock = threading.Lock()
+        self.stats: Dict[str, int] = {'queued': 0, 'written': 0, 'dropped': 0, 'errors': 0, 'bytes': 0}
+        self.threads: List[threading.Thread] = [threading.Thread(target=self._run, daemon=True) for _ in range(max(1, threads))]
+        for thread in self.threads:
+            thread.start()
+
+    def _count(self, key: str, value: int = 1) -> None:
+        with self.stats_lock:
+            self.stats[key] += value
+
+    def path_for(self, folder: str, name: str) -> str:
+        """Путь файла с расширением выбранного формата"""
+        return os.path.join(folder, f"{name}.{self.image_format}")
+
+    def submit(self, folder: str, name: str, frame: np.ndarray, label: Optional[str] = None,
+               on_written: Optional[Callable[[str], None]] = None) -> bool:
+        """Постановка копии кадра в очередь записи; при переполнении - политика drop_policy (False - кадр отброшен).
+        on_written вызывается потоком записи с путем файла после успешной записи"""
+        task = (folder, name, frame.copy(), label, on_written)
+        try:
+            if self.drop_policy == 'block':
+                self.queue.put(task, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(task)
+        except queue.Full:
+            if self.drop_policy != 'drop_oldest':
+                self._count('dropped')
+                return False
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self._count('dropped')
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(task)
+            except queue.Full:
+                self._count('dropped')
+                return False
+        self._count('queued')
+        return True
+
+    def _run(self) -> None:
+        while True:
+            task = self.queue.get()
+            try:
+                if task is None:
+                    return
+                self._write(*task)
+            finally:
+                self.queue.task_done()
+
+    def _write(self, folder: str, name: str, frame: np.ndarray, label: Optional[str], on_written: Optional[Callable[[str], None]]) -> None:
+        """Кодирование и запись файла (через imencode - пути с кириллицей работают и в Windows)"""
+        filepath = self.path_for(folder, name)
+        try:
+            ok, data = cv2.imencode(f".{self.image_format}", frame, self.encode_params)
+            if not ok:
+                raise ValueError("image encoding failed")
+            if not os.path.exists(folder):
+                os.makedirs(folder, exist_ok=True)
+            with open(filepath, 'wb') as f:
+                f.write(data.tobytes())
+            self._count('written')
+            self._count('bytes', len(data))
+            if self.log is not None and label is not None:
+                self.log(f'{label} saved: {os.path.basename(filepath)}.')
+            if on_written is not None:
+                on_written(filepath)
+        except Exception as e:
+            self._count('errors')
+            if self.log is not None:
+                self.log(f'Error saving {os.path.basename(filepath)}:\n{e}')
+
+    def get_stats(self) -> Dict[str, int]:
+        """Счетчики: поставлено в очередь, записано, отброшено, ошибок, байт; pending - ожидают записи"""
+        with self.stats_lock:
+            return dict(self.stats, pending=self.queue.qsize())
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Дописывает очередь (не дольше timeout) и останавливает потоки записи"""
+        deadline = time.time() + timeout
+        for _ in self.threads:
+            try:
+                self.queue.put(None, timeout=max(0.0, deadline - time.time()))
+            except queue.Full:
+                break
+        for thread in self.threads:
+            thread.join(timeout=max(0.0, deadline - time.time()))
+
+def create_image_writer(config: Dict[str, Any], log: Optional[Callable[[str], None]] = None) -> ImageWriter:
+    """Сервис записи снимков по настройкам IMAGE_WRITER_CONFIG"""
+    return ImageWriter(config.get('format', 'jpg'), config.get('quality', 90), config.get('queue_size', 8), config.get('drop_policy', 'drop_oldest'),
+                       config.get('block_timeout', 0.1), config.get('threads', 1), log)
@@ -2,15 +2,21 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import os
+import sys
 from datetime import datetime
 import face_recognition
 import time
 import threading
 import queue
 import logging
+import json
+import copy
+import hashlib
+import signal
 import multiprocessing
+from multiprocessing import shared_memory
 from PIL import Image, ImageDraw, ImageFont
-from typing import Optional, Callable, Tuple, Any, List, Dict, Union
+from typing import Optional, Callable, Tuple, Any, List, Dict, Union, Sequence, NamedTuple
 from re import match
 import math as m
 import atexit
@@ -1,11 +1,144 @@
 from imports import *
+from config import LOG_CONFIG
+
+def format_log_line(text: str) -> str:
+    return f"{datetime.now().replace(microsecond=0)} : {text}\n"
+
+class ProcessLog:
+    def __init__(self, log_queue: multiprocessing.Queue, file: str) -> None:
+        self.log_queue: multiprocessing.Queue = log_queue
+        self.file: str = file
+
+    def writelog(self, text: str) -> None:
+        """Передача сообщения процесса-обработчика в лог основного процесса (время - момент вызова)"""
+        try:
+            self.log_queue.put_nowait((self.file, format_log_line(text)))
+        except Exception:
+            pass
+
+class LogWriter:
+    def __init__(self, flush_interval: float = 1.0, flush_size: int = 65536, queue_size: int = 10000) -> None:
+        self.flush_interval: float = flush_interval
+        self.flush_size: int = flush_size
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.files: Dict[str, Any] = {} # путь -> открытый файл (один на все время работы)
+        self.pending_size: int = 0
+        self.last_flush: float = time.time()
+        self.dropped: int = 0
+        self.written: int = 0
+        self.closed: bool = False
+        self.process_queue: Optional[multiprocessing.Queue] = None
+        self.process_thread: Optional[threading.Thread] = None
+        self.lock: threading.Lock = threading.Lock()
+        self.thread: threading.Thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def write(self, file: str, text: str) -> None:
+        """Постановка строки в очередь записи без обращения к диску"""
+        self._put((file, format_log_line(text)))
+
+    def _put(self, record: Tuple[str, str]) -> None:
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def process_log(self, file: str) -> ProcessLog:
+        """Обработчик лога для процессов-обработчиков: строки идут через очередь multiprocessing в этот процесс"""
+        with self.lock:
+            if self.process_queue is None:
+                self.process_queue = multiprocessing.Queue()
+                self.process_thread = threading.Thread(target=self._forward, daemon=True)
+                self.process_thread.start()
+        return ProcessLog(self.process_queue, file)
+
+    def _forward(self) -> None:
+        while True:
+            try:
+                record = self.process_queue.get()
+            except (EOFError, OSError):
+                return
+            if record is None:
+                return
+            self._put(record)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush()
+                continue
+            if record is None:
+                self._flush()
+                return
+            self._write(*record)
+            if self.pending_size >= self.flush_size or time.time() - self.last_flush >= self.flush_interval:
+                self._flush()
+
+    def _write(self, file: str, line: str) -> None:
+        try:
+            handle = self.files.get(file)
+            if handle is None:
+                handle = self.files[file] = open(file, 'a')
+            handle.write(line)
+            self.pending_size += len(line)
+            self.written += 1
+        except OSError:
+            self.dropped += 1
+
+    def _flush(self) -> None:
+        for handle in self.files.values():
+            try:
+                handle.flush()
+            except OSError:
+                pass
+        self.pending_size = 0
+        self.last_flush = time.time()
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Запись оставшихся строк (включая строки обработчиков) и закрытие файлов"""
+        if self.closed:
+            return
+        if self.process_queue is not None:
+            self.process_queue.put(None)
+            self.process_thread.join(timeout=timeout)
+        self.closed = True
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout=timeout)
+        for handle in self.files.values():
+            try:
+                handle.close()
+            except OSError:
+                pass
+        self.files = {}
+
+def create_log_writer(config: Dict[str, Any] = LOG_CONFIG) -> LogWriter:
+    """Фоновая запись логов по настройкам LOG_CONFIG"""
+    return LogWriter(config.get('flush_interval', 1.0), config.get('flush_size', 65536), config.get('queue_size', 10000))
 
 class LogMaker:
     def __init__(self, file_manager: Any) -> None:
         self.file_manager: Any = file_manager
+        self.log_writer: LogWriter = file_manager.log_writer
         self.init: None = self.writelog(self.file_manager.get_logfile_name(), 'Flight Initialisation.')
 
     def writelog(self, file: str, text: str) -> None:
-        """Запись сообщения в лог-файл"""
-        with open(file, 'a') as f:
-            f.write(f"{datetime.now().replace(microsecond=0)} : {text}\n")
\ No newline at end of file
+        """Запись сообщения в лог-файл (через очередь фонового потока)"""
+        self.log_writer.write(file, text)
+
+    def process_log(self) -> ProcessLog:
+        """Лог основного файла для процессов-обработчиков"""
+        return self.log_writer.process_log(self.file_manager.get_logfile_name())
+
+    def close(self) -> None:
+        """Дозапись очереди и закрытие лог-файла"""
+        if self.log_writer.dropped:
+            self.log_writer.write(self.file_manager.get_logfile_name(), f'Log lines dropped: {self.log_writer.dropped}.')
+        self.log_writer.close()
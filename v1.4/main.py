@@ -4,60 +4,185 @@ from pose_detector import PoseDetector
 from face_recognizer import FaceRecognizer
 from file_manager import FileManager
 from logmaker import LogMaker
+from frame_buffer import SharedFrameRing
+from stage_timer import StageTimer, NullStageTimer
+from hud_renderer import OverlayRenderer
+from event_log import EventLog
+from config import FRAME_TRANSPORT_CONFIG, CAMERA_CONFIG, EVENT_LOG_CONFIG
 
 class HumanDetector:
-    def __init__(self) -> None:
+    def __init__(self, camera_config: Optional[Dict[str, Any]] = None, headless: bool = False, event_output: Optional[Any] = None) -> None:
+        self.event_output: Optional[Any] = event_output # поток строк событий (по умолчанию sys.stdout)
         self.file_manager: FileManager = FileManager()
         self.log_maker: LogMaker = LogMaker(self.file_manager)
-        self.camera: CameraController = CameraController(self.file_manager, self.log_maker)
-        self.pose_detector: PoseDetector = PoseDetector(self.file_manager, self.log_maker)
-        self.face_recognizer: FaceRecognizer = FaceRecognizer(self.file_manager, self.log_maker)
+        self.logfile_name: str = self.file_manager.get_logfile_name()
+        self.camera: CameraController = CameraController(self.file_manager, self.log_maker, camera_config)
+        self.frame_ring: Optional[SharedFrameRing] = self.create_frame_ring()
+        self.overlay_renderer: OverlayRenderer = OverlayRenderer()
+        self.event_log: Optional[EventLog] = self.create_event_log()
+        face_events = self.event_log.process_events() if self.event_log is not None and EVENT_LOG_CONFIG['face_events'] else None
+        self.pose_detector: PoseDetector = PoseDetector(self.file_manager, self.log_maker, self.frame_ring)
+        self.face_recognizer: FaceRecognizer = FaceRecognizer(self.file_manager, self.log_maker, self.frame_ring, self.overlay_renderer, face_events)
         self.previous_human_detected: bool = False
         self.current_human_detected: bool = False
         self.frame_count: int = 0
         self.fps: int = 0
-        self.logfile_name: str = self.file_manager.get_logfile_name()
+        self.capture_fps: int = 0
+        self.last_frame_id: int = -1
+        self.dropped_frames: int = 0
+        self.stage_timer: StageTimer = NullStageTimer()
+        self.headless: bool = headless
+        self.stop_requested: bool = False
+        self.reported_faces: set = set()
         
+    def create_frame_ring(self) -> Optional[SharedFrameRing]:
+        """Кольцо кадров в разделяемой памяти для процессов-обработчиков"""
+        if not FRAME_TRANSPORT_CONFIG['shared_memory']:
+            return None
+        try:
+            return SharedFrameRing(FRAME_TRANSPORT_CONFIG['slots'], (FRAME_TRANSPORT_CONFIG['max_height'], FRAME_TRANSPORT_CONFIG['max_width'], 3))
+        except Exception as e:
+            self.log_maker.writelog(self.logfile_name, f'Shared memory frame transport unavailable:\n{e}')
+            return None
+
+    def create_event_log(self) -> Optional[EventLog]:
+        """Журнал событий обнаружения (JSONL с разреженным индексом по времени)"""
+        if not EVENT_LOG_CONFIG['enabled']:
+            return None
+        try:
+            return EventLog(EVENT_LOG_CONFIG['path'], EVENT_LOG_CONFIG['index_bytes'], EVENT_LOG_CONFIG['flush_interval'])
+        except Exception as e:
+            self.log_maker.writelog(self.logfile_name, f'Event log unavailable:\n{e}')
+            return None
+
     def update_detection_status(self, human_detected: bool, frame: np.ndarray) -> None:
         """Обновление статуса обнаружения"""
         self.current_human_detected = human_detected
         if self.current_human_detected != self.previous_human_detected:
             if self.current_human_detected:
                 self.log_maker.writelog(self.logfile_name, 'Human Found.')
+                self.emit_event('human_found')
                 self.file_manager.save_human_photo(frame)
                 self.log_maker.writelog(self.logfile_name, 'Face recognition activated.')
             else:
                 self.log_maker.writelog(self.logfile_name, 'Human Lost.')
+                self.emit_event('human_lost')
                 self.log_maker.writelog(self.logfile_name, 'Face recognition deactivated.')
             self.previous_human_detected = self.current_human_detected
 
-    def show_camera_feed(self) -> None:
-        """Основная функция с поиском до первого сохранения"""
-        print("🚀 Запуск основного цикла обработки...")
+    def count_captured(self, frame_id: int) -> None:
+        """Учет кадров камеры: пропуск номеров - кадры, не дошедшие до обработки"""
+        if self.last_frame_id >= 0 and frame_id > self.last_frame_id + 1:
+            self.dropped_frames += frame_id - self.last_frame_id - 1
+        self.last_frame_id = frame_id
+
+    def frame_stats(self) -> Dict[str, int]:
+        """Кадры камеры, обработанные и пропущенные кадры"""
+        return {'captured': self.frame_count + self.dropped_frames, 'processed': self.frame_count, 'dropped': self.dropped_frames}
+
+    def emit_event(self, event: str, **data: Any) -> None:
+        """Событие обнаружения: запись в журнал событий; в режиме без окна - еще и строка JSON в stdout для внешних сервисов"""
+        if self.event_log is not None:
+            self.event_log.record(event, self.frame_count, **data)
+        if not self.headless:
+            return
+        record = {'time': datetime.now().isoformat(timespec='milliseconds'), 'event': event, 'frame': self.frame_count}
+        record.update(data)
+        print(json.dumps(record, ensure_ascii=False), file=self.event_output or sys.stdout, flush=True)
+
+    def update_face_events(self, recognized_persons: List[Tuple[str, Tuple[int, int, int, int], float]]) -> None:
+        """События появления и пропадания известных лиц"""
+        names = {name: (similarity, location) for name, location, similarity in recognized_persons if name != "Unknown"}
+        for name in names.keys() - self.reported_faces:
+            similarity, location = names[name]
+            self.log_maker.writelog(self.logfile_name, f'Face recognized: {name}.')
+            self.emit_event('face_recognized', name=name, similarity=round(float(similarity), 1), bbox=[int(value) for value in location])
+        for name in self.reported_faces - names.keys():
+            self.emit_event('face_lost', name=name)
+        self.reported_faces = set(names)
+
+    def request_stop(self, signum: int, frame: Any) -> None:
+        """Обработчик сигнала: завершение после текущего кадра"""
+        self.stop_requested = True
+
+    def install_signal_handlers(self) -> None:
+        """Остановка по SIGTERM (и SIGBREAK/SIGHUP, где есть) для работы службой"""
+        for name in ('SIGTERM', 'SIGBREAK', 'SIGHUP'):
+            if hasattr(signal, name):
+                try:
+                    signal.signal(getattr(signal, name), self.request_stop)
+                except (ValueError, OSError):
+                    pass
+
+    def enable_profiling(self) -> StageTimer:
+        """Включение замеров задержек этапов основного цикла"""
+        self.stage_timer = StageTimer()
+        return self.stage_timer
+
+    def show_camera_feed(self, max_frames: Optional[int] = None) -> None:
+        """Основная функция с поиском до первого сохранения (max_frames - остановка после заданного числа кадров)"""
+        print("🚀 Запуск основного цикла обработки..." + (" (без окна)" if self.headless else ""))
+        self.install_signal_handlers()
         fps_counter = 0
         last_fps_calc = time.time()
+        last_fps_frame_id = self.last_frame_id
+        key = -1
         try:
-            while True:
-                fps_counter += 1
-                ret, raw_frame = self.camera.get_frame()
+            while not self.stop_requested:
+                with self.stage_timer.stage('capture'):
+                    ret, raw_frame, frame_id, frame_time = self.camera.read_frame()
                 if not ret or raw_frame is None:
+                    if self.camera.is_finished():
+                        break
+                    if not self.headless:
+                        key = cv2.waitKey(1)
+                        if key & 0xFF == ord('q'):
+                            break
                     continue
-                display_frame = raw_frame.copy()
-                human_detected, display_frame = self.pose_detector.detect_and_draw_async(display_frame, self.frame_count)
-                recognized_persons = self.face_recognizer.process_faces(raw_frame, self.frame_count, human_detected)
-                display_frame = self.face_recognizer.draw_faces_and_message(display_frame, recognized_persons)
-                if self.frame_count % 30 == 0:
-                    self.update_detection_status(human_detected, raw_frame)
+                self.count_captured(frame_id)
+                fps_counter += 1
+                self.stage_timer.frame_captured(self.frame_count)
+                self.stage_timer.record('frame_age', time.time() - frame_time)
+                with self.stage_timer.stage('transport'):
+                    frame_ref = self.frame_ring.write(raw_frame, self.frame_count) if self.frame_ring else None
+                    display_frame = raw_frame if self.headless else raw_frame.copy()
+                with self.stage_timer.stage('pose'):
+                    if self.headless:
+                        human_detected = self.pose_detector.detect_async(raw_frame, self.frame_count, frame_ref)
+                    else:
+                        human_detected, display_frame = self.pose_detector.detect_and_draw_async(display_frame, self.frame_count, frame_ref)
+                self.stage_timer.result_received('pose', self.pose_detector.last_result_frame)
+                with self.stage_timer.stage('faces'):
+                    head_regions = self.pose_detector.get_head_regions(raw_frame.shape)
+                    recognized_persons = self.face_recognizer.process_faces(raw_frame, self.frame_count, human_detected, frame_ref, head_regions)
+                self.stage_timer.result_received('faces', self.face_recognizer.last_result_frame)
+                if not self.headless:
+                    with self.stage_timer.stage('draw_faces'):
+                        display_frame = self.face_recognizer.draw_faces_and_message(display_frame, recognized_persons)
+                with self.stage_timer.stage('status'):
+                    if self.frame_count % 30 == 0:
+                        self.update_detection_status(human_detected, raw_frame)
+                    self.update_face_events(recognized_persons)
                 current_time = time.time()
                 if current_time - last_fps_calc >= 1.0:
-                    self.fps = fps_counter
+                    self.fps = round(fps_counter / (current_time - last_fps_calc))
+                    self.capture_fps = round((self.last_frame_id - last_fps_frame_id) / (current_time - last_fps_calc))
                     fps_counter = 0
                     last_fps_calc = current_time
-                frame = self.add_info_text(display_frame, human_detected)
-                cv2.imshow('Pioneer-human-detector', frame)
+                    last_fps_frame_id = self.last_frame_id
+                if not self.headless:
+                    with self.stage_timer.stage('hud'):
+                        frame = self.add_info_text(display_frame, human_detected)
+                    with self.stage_timer.stage('imshow'):
+                        cv2.imshow('Pioneer-human-detector', frame)
+                        key = cv2.waitKey(1)
                 self.frame_count += 1
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                if max_frames is not None and self.frame_count >= max_frames:
+                    break
+                if key & 0xFF == ord('q'):
                     break
+            if self.stop_requested:
+                print("\n🛑 Остановка по сигналу")
         except KeyboardInterrupt:
             print("\n🛑 Остановка по Ctrl+C")
         except Exception as e:
@@ -67,60 +192,75 @@ class HumanDetector:
             self.cleanup()
 
     def add_info_text(self, frame: np.ndarray, human_detected: bool) -> np.ndarray:
-        """Добавление текста с полупрозрачным фоном - без темных линий"""
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(frame_rgb)
-        draw = ImageDraw.Draw(pil_img, 'RGBA')
-        try:
-            font = ImageFont.truetype("verdanab.ttf", 14)
-        except:
-            font = ImageFont.load_default()
-        x1, y1 = 0, 0
+        """Добавление текста с полупрозрачным фоном - готовая панель смешивается только в своей области"""
         status_text = "ЧЕЛОВЕК ОБНАРУЖЕН" if human_detected else "ЧЕЛОВЕК НЕ ОБНАРУЖЕН"
         text_color = (127, 255, 0) if human_detected else (220, 20, 60)
-        status_bbox = draw.textbbox((0, 0), status_text, font=font)
-        status_width, status_height = status_bbox[2] - status_bbox[0], status_bbox[3] - status_bbox[1]
-        fps_bbox = draw.textbbox((0, 0), f"FPS: {self.fps}", font=font)
-        fps_width, fps_height = fps_bbox[2] - fps_bbox[0], fps_bbox[3] - fps_bbox[1]
         if self.face_recognizer.face_search_active:
             search_status = "ПОИСК ЛИЦ АКТИВЕН"
             search_color = (127, 255, 0)
         else:
             search_status = "ПОИСК ЛИЦ НЕ АКТИВЕН"
             search_color = (220, 20, 60)
-        search_bbox = draw.textbbox((0, 0), search_status, font=font)
-        search_width, search_height = search_bbox[2] - search_bbox[0], search_bbox[3] - search_bbox[1]
-        x2, y2 = 5 + max(status_width, fps_width, search_width) + 10, 5 + status_height + 5 + fps_height + 5 + search_height + 10
-        radius = 25
-        points = [(x1, y1), (x2, y1), (x2, y2 - radius)]
-        center_x, center_y = x2 - radius, y2 - radius
-        for angle in range(0, 91, 10):
-            rad = np.radians(angle)
-            px = center_x + radius * np.cos(rad)
-            py = center_y + radius * np.sin(rad)
-            points.append((px, py))
-        points.append((x1, y2))
-        points.append((x1, y1))
-        draw.polygon(points, fill=(128, 128, 128, 128))
-        draw.text((x1 + 5, y1 + 5), status_text, font=font, fill=text_color)
-        draw.text((x1 + 5, y1 + status_height + 10), f"FPS: {self.fps}", font=font, fill=(224, 255, 255))
-        draw.text((x1 + 5, y1 + status_height + fps_height + 15), search_status, font=font, fill=search_color)
-        result = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
-        return result
+        lines = [(status_text, text_color), (f"FPS: {self.fps} / КАМЕРА: {self.capture_fps}", (224, 255, 255)), (search_status, search_color)]
+        return self.overlay_renderer.draw_panel(frame, lines, 0, 0, corner='bottom')
 
     def cleanup(self) -> None:
         """Очистка ресурсов"""
         print("🧹 Очистка ресурсов...")
+        stats = self.frame_stats()
+        print(f"📊 Кадров камеры: {stats['captured']}, обработано: {stats['processed']}, пропущено: {stats['dropped']}")
+        self.log_maker.writelog(self.logfile_name, f"Frames captured: {stats['captured']}, processed: {stats['processed']}, dropped: {stats['dropped']}.")
         try:
             self.camera.cleanup()
             self.pose_detector.cleanup()
             self.face_recognizer.cleanup()
-            cv2.destroyAllWindows()
+            writer_stats = self.file_manager.cleanup()
+            self.log_maker.writelog(self.logfile_name, f"Saved photos: {writer_stats['queued']} queued, {writer_stats['written']} written, {writer_stats['dropped']} dropped, {writer_stats['errors']} write errors.")
+            if self.frame_ring:
+                self.frame_ring.close()
+            if not self.headless:
+                cv2.destroyAllWindows()
             print("✅ Все ресурсы успешно освобождены")
         except Exception as e:
             print(f"⚠️ Ошибка при очистке ресурсов: {e}")
+        if self.event_log is not None:
+            self.event_log.close()
+            self.log_maker.writelog(self.logfile_name, f'Detection events recorded: {self.event_log.recorded}.')
+        self.log_maker.close()
+
+def parse_camera_config(args: Any) -> Dict[str, Any]:
+    """Настройки камеры с учетом аргументов командной строки"""
+    camera_config = dict(CAMERA_CONFIG)
+    if args.replay:
+        camera_config.update({'source': 'file', 'replay_path': args.replay, 'replay_mode': args.replay_mode, 'replay_loop': args.loop})
+        if args.replay_fps:
+            camera_config['replay_fps'] = args.replay_fps
+    return camera_config
+
+def redirect_console() -> Any:
+    """Режим службы: stdout остается только для строк событий, весь остальной вывод (включая процессы-обработчики) идет в stderr.
+    Возвращает поток для строк событий"""
+    sys.stdout.flush()
+    try:
+        event_fd = os.dup(sys.stdout.fileno())
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+        return os.fdopen(event_fd, 'w', encoding='utf-8', buffering=1)
+    except (AttributeError, OSError, ValueError):
+        event_output = sys.stdout
+        sys.stdout = sys.stderr
+        return event_output
 
 if __name__ == "__main__":
+    import argparse
     multiprocessing.freeze_support()
-    detector = HumanDetector()
-    detector.show_camera_feed()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pioneer human detector")
+    parser.add_argument('--replay', default=None, help="play back a video file or a folder of frames instead of a camera")
+    parser.add_argument('--replay-mode', default=CAMERA_CONFIG['replay_mode'], choices=['native', 'fixed', 'fast'])
+    parser.add_argument('--replay-fps', type=float, default=None, help="frame rate for --replay-mode fixed")
+    parser.add_argument('--loop', action='store_true', help="restart the recording when it ends")
+    parser.add_argument('--headless', action='store_true', help="no window and no drawing, detection events are printed as JSON lines on stdout, all other output goes to stderr")
+    parser.add_argument('--max-frames', type=int, default=None, help="stop after this many frames")
+    args = parser.parse_args()
+    event_output = redirect_console() if args.headless else None
+    detector = HumanDetector(parse_camera_config(args), headless=args.headless, event_output=event_output)
+    detector.show_camera_feed(max_frames=args.max_frames)
\ No newline at end of file
@@ -1,98 +1,212 @@
 from imports import *
 from config import MEDIAPIPE_CONFIG, ASYNC_CONFIG
+from frame_buffer import SharedFrameRing, FrameRef
+from logmaker import ProcessLog
 
 logging.getLogger('mediapipe').setLevel(logging.ERROR)
 
-def pose_worker(input_queue: multiprocessing.Queue, output_queue: multiprocessing.Queue, config: Dict[str, Any]) -> None:
-    """Процесс распознавания скелета человека"""
+VISIBILITY_THRESHOLD = 0.5
+POSE_CONNECTIONS: np.ndarray = np.array(sorted(mp.solutions.pose.POSE_CONNECTIONS), dtype=np.int32)
+
+def landmarks_to_array(pose_landmarks: Any) -> Optional[np.ndarray]:
+    """Ключевые точки MediaPipe в массив (33, 4): x, y, z, visibility"""
+    if not pose_landmarks:
+        return None
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark], dtype=np.float32)
+
+HEAD_LANDMARKS = slice(0, 11) # нос, глаза, уши, рот
+
+def head_region(landmarks: np.ndarray, frame_shape: Tuple[int, ...], margin: float = 0.6) -> Optional[Tuple[int, int, int, int]]:
+    """Область головы (top, right, bottom, left) по ключевым точкам лица позы"""
+    frame_height, frame_width = frame_shape[:2]
+    head = landmarks[HEAD_LANDMARKS]
+    head = head[head[:, 3] >= VISIBILITY_THRESHOLD]
+    if len(head) < 2:
+        return None
+    xs, ys = head[:, 0] * frame_width, head[:, 1] * frame_height
+    size = max(xs.max() - xs.min(), ys.max() - ys.min(), 20.0)
+    left = int(max(0, xs.min() - size * margin))
+    right = int(min(frame_width, xs.max() + size * margin))
+    top = int(max(0, ys.min() - size * (margin + 0.3)))
+    bottom = int(min(frame_height, ys.max() + size * (margin + 0.3)))
+    if right - left < 20 or bottom - top < 20:
+        return None
+    return top, right, bottom, left
+
+def draw_pose_landmarks(frame: np.ndarray, landmarks: np.ndarray, landmark_color: Tuple[int, int, int] = (0, 255, 0),
+                        connection_color: Tuple[int, int, int] = (255, 0, 0), thickness: int = 2, circle_radius: int = 2) -> None:
+    """Отрисовка скелета напрямую из массива (33, 4), как mp_drawing.draw_landmarks"""
+    frame_height, frame_width = frame.shape[:2]
+    x, y, visibility = landmarks[:, 0], landmarks[:, 1], landmarks[:, 3]
+    visible = (visibility >= VISIBILITY_THRESHOLD) & (x >= 0) & (x <= 1) & (y >= 0) & (y <= 1)
+    points = np.empty((len(landmarks), 2), dtype=np.int32)
+    points[:, 0] = np.minimum(np.floor(x * frame_width), frame_width - 1)
+    points[:, 1] = np.minimum(np.floor(y * frame_height), frame_height - 1)
+    connections = POSE_CONNECTIONS[visible[POSE_CONNECTIONS[:, 0]] & visible[POSE_CONNECTIONS[:, 1]]]
+    if len(connections):
+        cv2.polylines(frame, points[connections], False, connection_color, thickness)
+    border_radius = max(circle_radius + 1, int(circle_radius * 1.2))
+    for px, py in points[visible]:
+        cv2.circle(frame, (int(px), int(py)), border_radius, (224, 224, 224), thickness)
+        cv2.circle(frame, (int(px), int(py)), circle_radius, landmark_color, thickness)
+
+def pose_worker(input_queue: multiprocessing.Queue, output_queue: multiprocessing.Queue, config: Dict[str, Any], frame_ring_descriptor: Optional[Dict[str, Any]] = None,
+                worker_id: int = 0, log: Optional[ProcessLog] = None) -> None:
+    """Процесс распознавания скелета человека; на каждую задачу - ответ (точки, номер кадра, обработчик, кадр обработан)"""
     mp_pose = mp.solutions.pose
     pose_detector = mp_pose.Pose(**config)
+    frame_ring = SharedFrameRing.attach(frame_ring_descriptor) if frame_ring_descriptor else None
     while True:
+        frame_count = -1
         try:
             task = input_queue.get()
             if task is None:
                 break
             frame, frame_count = task
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            if isinstance(frame, FrameRef):
+                frame_ref = frame
+                frame = frame_ring.view(frame_ref)
+                if frame is None:
+                    output_queue.put((None, frame_count, worker_id, False))
+                    continue
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                if not frame_ring.is_current(frame_ref):
+                    output_queue.put((None, frame_count, worker_id, False))
+                    continue
+            else:
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             results = pose_detector.process(rgb_frame)
-            landmarks_data = None
-            if results.pose_landmarks:
-                landmarks_data = []
-                for lm in results.pose_landmarks.landmark:
-                    landmarks_data.append({'x': lm.x, 'y': lm.y, 'z': lm.z, 'visibility': lm.visibility})
-            output_queue.put((landmarks_data, frame_count))
+            output_queue.put((landmarks_to_array(results.pose_landmarks), frame_count, worker_id, True))
         except Exception as e:
+            if log is not None:
+                log.writelog(f'Pose worker {worker_id} error on frame {frame_count}:\n{e}')
+            output_queue.put((None, frame_count, worker_id, False))
             continue
 
 class PoseDetector:
-    def __init__(self, file_manager: Any, log_maker: Any) -> None:
+    def __init__(self, file_manager: Any, log_maker: Any, frame_ring: Optional[SharedFrameRing] = None) -> None:
         self.file_manager: Any = file_manager
         self.log_maker: Any = log_maker
         self.logfile_name: str = self.file_manager.get_logfile_name()
+        self.frame_ring: Optional[SharedFrameRing] = frame_ring
         self.mp_pose = mp.solutions.pose
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.input_queue: multiprocessing.Queue = multiprocessing.Queue(maxsize=1)
-        self.output_queue: multiprocessing.Queue = multiprocessing.Queue(maxsize=1)
+        self.workers: int = max(1, ASYNC_CONFIG.get('pose_workers') or max(1, (os.cpu_count() or 2) // 2))
+        self.input_queues: List[multiprocessing.Queue] = []
+        self.output_queue: multiprocessing.Queue = multiprocessing.Queue(maxsize=2 * self.workers)
+        self.processes: List[multiprocessing.Process] = []
         self.process: Optional[multiprocessing.Process] = None
-        self.last_landmarks: Optional[landmark_pb2.NormalizedLandmarkList] = None
+        self.pending: Dict[int, Tuple[int, float]] = {} # номер кадра -> (обработчик, время отправки)
+        self.next_worker: int = 0
+        self.last_landmarks: Optional[np.ndarray] = None
+        self.last_result_frame: int = -1
+        self.stats: Dict[str, int] = {'submitted': 0, 'completed': 0, 'busy': 0, 'stale': 0, 'skipped': 0, 'timeouts': 0}
         if ASYNC_CONFIG['pose_processing']:
             self.start_process()
         else:
             self.pose_detector = self.mp_pose.Pose(**MEDIAPIPE_CONFIG)
 
     def start_process(self) -> None:
-        self.process = multiprocessing.Process(
-            target=pose_worker,
-            args=(self.input_queue, self.output_queue, MEDIAPIPE_CONFIG),
-            daemon=True
-        )
-        self.process.start()
-
-    def detect_and_draw_async(self, frame: np.ndarray, frame_count: int) -> Tuple[bool, np.ndarray]:
-        """Асинхронное обнаружение и отрисовка"""
-        human_detected = False
+        descriptor = self.frame_ring.descriptor() if self.frame_ring else None
+        for worker_id in range(self.workers):
+            input_queue = multiprocessing.Queue(maxsize=1)
+            process = multiprocessing.Process(
+                target=pose_worker,
+                args=(input_queue, self.output_queue, MEDIAPIPE_CONFIG, descriptor, worker_id, self.log_maker.process_log()),
+                daemon=True
+            )
+            process.start()
+            self.input_queues.append(input_queue)
+            self.processes.append(process)
+        self.process = self.processes[0]
+        if self.workers > 1:
+            self.log_maker.writelog(self.logfile_name, f'Pose detection started in {self.workers} worker processes.')
+
+    def _free_worker(self) -> Optional[int]:
+        """Следующий по кругу обработчик без кадра в работе (зависшие дольше processing_timeout освобождаются)"""
+        now = time.time()
+        for frame_count, (worker_id, sent_time) in list(self.pending.items()):
+            if now - sent_time > ASYNC_CONFIG['processing_timeout']:
+                del self.pending[frame_count]
+                self.stats['timeouts'] += 1
+        busy = {worker_id for worker_id, _ in self.pending.values()}
+        for offset in range(self.workers):
+            worker_id = (self.next_worker + offset) % self.workers
+            if worker_id not in busy:
+                self.next_worker = (worker_id + 1) % self.workers
+                return worker_id
+        return None
+
+    def _submit(self, frame: np.ndarray, frame_count: int, frame_ref: Optional[FrameRef]) -> None:
+        worker_id = self._free_worker()
+        if worker_id is None:
+            self.stats['busy'] += 1
+            return
+        try:
+            self.input_queues[worker_id].put_nowait((frame_ref if frame_ref is not None else frame.copy(), frame_count))
+            self.pending[frame_count] = (worker_id, time.time())
+            self.stats['submitted'] += 1
+        except queue.Full:
+            self.stats['busy'] += 1
+
+    def _collect(self) -> None:
+        """Прием результатов: показывается результат самого нового кадра, опоздавшие результаты старых кадров отбрасываются"""
+        try:
+            while not self.output_queue.empty():
+                landmarks, frame_count, worker_id, processed = self.output_queue.get_nowait()
+                self.pending.pop(frame_count, None)
+                if not processed:
+                    self.stats['skipped'] += 1
+                elif frame_count <= self.last_result_frame:
+                    self.stats['stale'] += 1
+                else:
+                    self.stats['completed'] += 1
+                    self.last_landmarks, self.last_result_frame = landmarks, frame_count
+        except queue.Empty:
+            pass
+
+    def detect_async(self, frame: np.ndarray, frame_count: int, frame_ref: Optional[FrameRef] = None) -> bool:
+        """Асинхронное обнаружение без отрисовки (frame_ref - кадр уже записан в разделяемую память)"""
         if self.process:
-            try:
-                self.input_queue.put_nowait((frame.copy(), frame_count))
-            except queue.Full:
-                pass
-            try:
-                while not self.output_queue.empty():
-                    landmarks_data, _ = self.output_queue.get_nowait()
-                    if landmarks_data:
-                        landmark_list = landmark_pb2.NormalizedLandmarkList()
-                        for lm_dict in landmarks_data:
-                            lm = landmark_list.landmark.add()
-                            lm.x = lm_dict['x']
-                            lm.y = lm_dict['y']
-                            lm.z = lm_dict['z']
-                            lm.visibility = lm_dict['visibility']
-                        self.last_landmarks = landmark_list
-                    else:
-                        self.last_landmarks = None
-            except queue.Empty:
-                pass
+            self._collect()
+            self._submit(frame, frame_count, frame_ref)
         else:
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             results = self.pose_detector.process(rgb_frame)
-            self.last_landmarks = results.pose_landmarks
-        if self.last_landmarks:
-            human_detected = True
-            self.mp_drawing.draw_landmarks(
-                frame,
-                self.last_landmarks,
-                self.mp_pose.POSE_CONNECTIONS,
-                self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                self.mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2)
-            )
+            self.last_landmarks = landmarks_to_array(results.pose_landmarks)
+            self.last_result_frame = frame_count
+        return self.last_landmarks is not None
+
+    def detect_and_draw_async(self, frame: np.ndarray, frame_count: int, frame_ref: Optional[FrameRef] = None) -> Tuple[bool, np.ndarray]:
+        """Асинхронное обнаружение и отрисовка (frame_ref - кадр уже записан в разделяемую память)"""
+        human_detected = self.detect_async(frame, frame_count, frame_ref)
+        if human_detected:
+            draw_pose_landmarks(frame, self.last_landmarks)
         return human_detected, frame
 
+    def get_head_regions(self, frame_shape: Tuple[int, ...]) -> List[Tuple[int, int, int, int]]:
+        """Области голов по последним ключевым точкам для поиска лиц"""
+        if self.last_landmarks is None:
+            return []
+        region = head_region(self.last_landmarks, frame_shape)
+        return [region] if region is not None else []
+
+    def get_stats(self) -> Dict[str, int]:
+        """Счетчики пула: отправлено, обработано, пропущено из-за занятости, устаревшие и необработанные результаты"""
+        return dict(self.stats, workers=self.workers)
+
     def cleanup(self) -> None:
         """Очистка ресурсов"""
         if self.process:
-            self.input_queue.put(None)
-            self.process.join(timeout=1.0)
-            if self.process.is_alive():
-                self.process.terminate()
+            stats = self.get_stats()
+            self.log_maker.writelog(self.logfile_name, f"Pose workers: {stats['workers']}, frames submitted: {stats['submitted']}, results shown: {stats['completed']}, late results dropped: {stats['stale']}, frames dropped while busy: {stats['busy']}.")
+            for input_queue in self.input_queues:
+                try:
+                    input_queue.put(None, timeout=0.5)
+                except queue.Full:
+                    pass
+            for process in self.processes:
+                process.join(timeout=1.0)
+                if process.is_alive():
+                    process.terminate()
         elif hasattr(self, 'pose_detector'):
             self.pose_detector.close()
\ No newline at end of file
@@ -0,0 +1,102 @@
+from imports import *
+
+REPLAY_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+class ReplaySource:
+    def __init__(self, path: str, mode: str = 'native', fps: Optional[float] = None, loop: bool = False) -> None:
+        if mode not in ('native', 'fixed', 'fast'):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.path: str = path
+        self.mode: str = mode
+        self.loop: bool = loop
+        self.stream: Optional[cv2.VideoCapture] = None
+        self.images: List[str] = []
+        if os.path.isdir(path):
+            self.images = sorted(os.path.join(path, filename) for filename in os.listdir(path) if filename.lower().endswith(REPLAY_IMAGE_EXTENSIONS))
+            native_fps = 30.0
+        else:
+            self.stream = cv2.VideoCapture(path)
+            native_fps = self.stream.get(cv2.CAP_PROP_FPS) or 30.0
+        self.fps: float = fps if mode == 'fixed' and fps else native_fps
+        self.position: int = 0
+        self.frames_read: int = 0
+        self.sequence: int = 0 # кадры записи с начала воспроизведения, включая пропущенные и повторы
+        self.finished: bool = False
+        self.start_time: Optional[float] = None
+
+    def isOpened(self) -> bool:
+        if self.stream is not None:
+            return self.stream.isOpened()
+        return len(self.images) > 0
+
+    def start(self) -> Any:
+        self.start_time = time.time()
+        return self
+
+    def _rewind(self) -> bool:
+        """Переход к началу записи (если включен повтор)"""
+        if not self.loop or self.frames_read == 0:
+            self.finished = True
+            return False
+        if self.stream is not None:
+            self.stream.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.position = 0
+        self.start_time = time.time()
+        return True
+
+    def _skip(self) -> bool:
+        """Пропуск кадра без декодирования"""
+        if self.stream is not None:
+            grabbed = self.stream.grab()
+        else:
+            grabbed = self.position < len(self.images)
+        if grabbed:
+            self.position += 1
+            self.sequence += 1
+            return True
+        return self._rewind()
+
+    def _next(self) -> Optional[np.ndarray]:
+        """Следующий кадр записи"""
+        for _ in range(2):
+            if self.stream is not None:
+                grabbed, frame = self.stream.read()
+            else:
+                frame = cv2.imread(self.images[self.position]) if self.position < len(self.images) else None
+                grabbed = frame is not None
+            if grabbed:
+                self.position += 1
+                self.sequence += 1
+                self.frames_read += 1
+                return frame
+            if not self._rewind():
+                return None
+        return None
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Кадр с темпом записи ('native'), заданным FPS ('fixed') или без задержек ('fast')"""
+        if self.finished:
+            return False, None
+        if self.start_time is None:
+            self.start()
+        if self.mode != 'fast':
+            due = self.start_time + self.position / self.fps
+            now = time.time()
+            if now < due:
+                time.sleep(due - now)
+            else:
+                behind = int((now - self.start_time) * self.fps) - self.position
+                for _ in range(behind):
+                    if not self._skip() or self.position == 0:
+                        break
+        frame = self._next()
+        if frame is None:
+            return False, None
+        return True, frame
+
+    def stop(self) -> None:
+        if self.stream is not None:
+            self.stream.release()
+
+    def release(self) -> None:
+        self.stop()
\ No newline at end of file
@@ -0,0 +1,85 @@
+from imports import *
+
+MAX_PENDING_CAPTURES = 512
+
+def latency_summary(samples: List[float]) -> Dict[str, Any]:
+    """Статистика задержек в миллисекундах"""
+    if not samples:
+        return {'count': 0, 'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'count': len(values), 'mean_ms': float(values.mean()), 'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99), 'max_ms': float(values.max())}
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+        self.end_to_end: Dict[str, List[float]] = {}
+        self.capture_times: Dict[int, float] = {}
+        self.last_result_frames: Dict[str, int] = {}
+        self.frames: int = 0
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self._stage: str = ''
+        self._stage_start: float = 0.0
+
+    def stage(self, name: str) -> "StageTimer":
+        """Замер этапа: with timer.stage('pose'): ..."""
+        self._stage = name
+        return self
+
+    def __enter__(self) -> "StageTimer":
+        self._stage_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.record(self._stage, time.perf_counter() - self._stage_start)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.samples.setdefault(name, []).append(seconds)
+
+    def frame_captured(self, frame_count: int) -> None:
+        """Отметка времени захвата кадра для сквозной задержки"""
+        now = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = now
+        self.end_time = now
+        self.frames += 1
+        self.capture_times[frame_count] = now
+        if len(self.capture_times) > MAX_PENDING_CAPTURES:
+            del self.capture_times[next(iter(self.capture_times))]
+
+    def result_received(self, name: str, frame_count: int) -> None:
+        """Сквозная задержка от захвата кадра до появления результата обработчика для него"""
+        if frame_count <= self.last_result_frames.get(name, -1):
+            return
+        self.last_result_frames[name] = frame_count
+        capture_time = self.capture_times.get(frame_count)
+        if capture_time is not None:
+            self.end_to_end.setdefault(name, []).append(time.perf_counter() - capture_time)
+
+    def summary(self) -> Dict[str, Any]:
+        """Пропускная способность и перцентили задержек по этапам"""
+        wall_time = (self.end_time - self.start_time) if self.start_time is not None and self.end_time is not None else 0.0
+        return {
+            'frames': self.frames,
+            'wall_time_s': wall_time,
+            'throughput_fps': (self.frames - 1) / wall_time if wall_time > 0 else None,
+            'stages': {name: latency_summary(samples) for name, samples in self.samples.items()},
+            'end_to_end': {name: latency_summary(samples) for name, samples in self.end_to_end.items()}
+        }
+
+class NullStageTimer(StageTimer):
+    def __enter__(self) -> "StageTimer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def record(self, name: str, seconds: float) -> None:
+        pass
+
+    def frame_captured(self, frame_count: int) -> None:
+        pass
+
+    def result_received(self, name: str, frame_count: int) -> None:
+        pass
\ No newline at end of file
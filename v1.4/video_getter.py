@@ -1,17 +1,29 @@
 from imports import *
 
 class VideoGetter:
-    def __init__(self, src: int = 0):
+    def __init__(self, src: int = 0, buffers: int = 3):
         self.stream: cv2.VideoCapture = cv2.VideoCapture(src)
-        if not self.stream.isOpened():
-            self.started: bool = False
-            return
         self.started: bool = False
-        self.read_lock: threading.Lock = threading.Lock()
-        self.grabbed: bool
-        self.frame: Optional[np.ndarray] = self.stream.read()
         self.stopped: bool = False
-        
+        self.grabbed: bool = False
+        self.read_lock: threading.Lock = threading.Lock()
+        self.new_frame: threading.Condition = threading.Condition(self.read_lock)
+        self.buffers: List[Optional[np.ndarray]] = [None] * max(3, buffers)
+        self.timestamps: List[float] = [0.0] * len(self.buffers)
+        self.front: int = 0 # кадр, выданный потребителю (не перезаписывается до следующего read)
+        self.middle: int = 1 # последний готовый кадр
+        self.back: int = 2 # кадр, в который читает поток захвата
+        self.frame_id: int = -1 # номер последнего готового кадра
+        self.front_id: int = -1
+        if not self.stream.isOpened():
+            return
+        grabbed, frame = self.stream.read()
+        if grabbed and frame is not None:
+            self.buffers[self.middle] = frame
+            self.timestamps[self.middle] = time.time()
+            self.grabbed = True
+            self.frame_id = 0
+
     def start(self) -> Any:
         if self.started:
             return self
@@ -21,28 +33,51 @@ class VideoGetter:
         return self
 
     def update(self) -> None:
+        """Захват в свободный буфер без копирования и обмен с последним готовым кадром"""
         while self.started:
             if self.stopped:
                 break
-            grabbed, frame = self.stream.read()
-            with self.read_lock:
+            buffer = self.buffers[self.back]
+            grabbed, frame = self.stream.read(image=buffer) if buffer is not None else self.stream.read()
+            with self.new_frame:
                 self.grabbed = grabbed
-                self.frame = frame
+                if grabbed and frame is not None:
+                    self.buffers[self.back] = frame
+                    self.timestamps[self.back] = time.time()
+                    self.back, self.middle = self.middle, self.back
+                    self.frame_id += 1
+                self.new_frame.notify_all()
             if not grabbed:
                 self.stop()
-                
+
+    def read_frame(self, last_id: Optional[int] = None, timeout: Optional[float] = None) -> Tuple[bool, Optional[np.ndarray], int, float]:
+        """Последний кадр только для чтения, его номер и время захвата; с last_id - ожидание кадра новее него (до timeout).
+        Кадр действителен до следующего вызова read/read_frame"""
+        with self.new_frame:
+            if last_id is not None and self.grabbed and self.frame_id <= last_id:
+                self.new_frame.wait_for(lambda: self.frame_id > last_id or not self.grabbed, timeout)
+            if not self.grabbed or self.frame_id < 0:
+                return False, None, self.frame_id, 0.0
+            if self.front_id != self.frame_id:
+                self.front, self.middle = self.middle, self.front
+                self.front_id = self.frame_id
+            frame = self.buffers[self.front].view()
+            timestamp = self.timestamps[self.front]
+        frame.flags.writeable = False
+        return True, frame, self.front_id, timestamp
+
     def read(self) -> Tuple[bool, Optional[np.ndarray]]:
-        with self.read_lock:
-            if not self.grabbed:
-                return False, None
-            return True, self.frame.copy()
+        ret, frame, _, _ = self.read_frame()
+        return ret, frame
 
     def stop(self) -> None:
         self.started = False
         self.stopped = True
-        if hasattr(self, 'thread') and self.thread.is_alive():
+        with self.new_frame:
+            self.new_frame.notify_all()
+        if hasattr(self, 'thread') and self.thread.is_alive() and self.thread is not threading.current_thread():
             self.thread.join(timeout=1.0)
         self.stream.release()
 
     def isOpened(self) -> bool:
-        return self.stream.isOpened()
\ No newline at end of file
+        return self.stream.isOpened()